@@ -0,0 +1,208 @@
+# encoding: utf-8
+"""Synthetic knot diagrams of any size.
+
+Every generator returns ``(vertices, over)``, ready for
+``KnotModel(vertices, over)``: a closed polygon (the first vertex is
+repeated at the end) and the 'over' flag of every vertex. Except for the
+random walks the polygons come from curves in space, and the flags are
+taken from the heights of the strands at each crossing. The curves are
+sampled finely enough that no segment crosses more than one strand, so
+the diagrams are the knots they are named after."""
+import math
+import random
+
+from knoteasy.core import Point, Line, SegmentGrid
+
+
+def _height(line, z0, z1, point):
+    length = line.orig.distance(line.dest)
+
+    if not length:
+        return z0
+
+    return z0 + (z1 - z0) * line.orig.distance(point) / length
+
+
+def _diagram(points):
+    """Closes a polygon of (x, y, z) points and decides the flags from the
+    heights at the first crossing of every new segment."""
+    points = list(points) + [points[0]]
+    vertices = [Point(x, y) for x, y, z in points]
+    over = [True]
+    lines = []
+    grid = SegmentGrid()
+
+    for j in xrange(1, len(points)):
+        line = Line(vertices[j - 1], vertices[j])
+        flag = True
+
+        for i in grid.candidates(line):
+            if i < len(lines) - 1 and lines[i].intersects(line):
+                crosspoint = lines[i].intersection(line)
+                flag = _height(line, points[j - 1][2], points[j][2], crosspoint) > \
+                       _height(lines[i], points[i][2], points[i + 1][2], crosspoint)
+                break
+
+        over.append(flag)
+        lines.append(line)
+        grid.append(line)
+
+    return vertices, over
+
+
+def torus_knot(p, q, samples=None, radius=200.0):
+    """T(p, q) on a standard torus, with (p - 1) * q crossings."""
+    if samples is None:
+        samples = max(64, 16 * (p - 1) * q)
+
+    points = []
+
+    for k in xrange(samples):
+        t = 2 * math.pi * k / samples
+        r = radius * (2 + math.cos(q * t)) / 3.0
+        points.append((radius * 2 + r * math.cos(p * t),
+                       radius * 2 + r * math.sin(p * t),
+                       -math.sin(q * t)))
+
+    return _diagram(points)
+
+
+def pretzel_knot(*twists, **kw):
+    """Pretzel knot P(t1, ..., tk): k vertical twist regions joined at the
+    top and at the bottom. The twists must give a knot, not a link (either
+    k odd and all of them odd, or exactly one of them even). ``samples``
+    (vertices per half twist) must be even."""
+    samples = kw.get('samples', 12)
+    width = 30.0
+    height = max([abs(t) for t in twists]) * 40.0 + 40.0
+    levels = {'top': 100.0, 'bottom': 100.0 + height}
+    columns = [100.0 + 120.0 * i for i in xrange(len(twists))]
+    last = len(twists) - 1
+
+    def strand(i, side):
+        # strand of column i from the top (side 0 left, 1 right) down. The
+        # strands cross at whole multiples of samples / 2 steps: sampling
+        # in between keeps vertices off the crossings
+        steps = max(samples * abs(twists[i]), 2)
+        phase = math.pi if side == 0 else 0.0
+        positions = [0.0] + [k + 0.5 for k in xrange(steps)] + [steps]
+
+        return [(columns[i] + width * math.cos(phase + math.pi * twists[i] * k / steps),
+                 levels['top'] + height * k / steps,
+                 math.sin(phase + math.pi * twists[i] * k / steps))
+                for k in positions]
+
+    # joins from the right side of every column to the left side of the
+    # next one, the last one going around all the others
+    joins = {}
+
+    for level, outside in (('top', -1), ('bottom', 1)):
+        y = levels[level]
+
+        for i in xrange(len(twists)):
+            x0 = columns[i] + width
+
+            if i < last:
+                x1 = columns[i + 1] - width
+                path = [(x0, y, 0.0), ((x0 + x1) / 2.0, y + 15.0 * outside, 0.0), (x1, y, 0.0)]
+                other = (i + 1, level, 0)
+            else:
+                x1 = columns[0] - width
+                path = [(x0, y, 0.0), (x0, y + 60.0 * outside, 0.0),
+                        (x1, y + 60.0 * outside, 0.0), (x1, y, 0.0)]
+                other = (0, level, 0)
+
+            joins[(i, level, 1)] = (other, path)
+            joins[other] = ((i, level, 1), list(reversed(path)))
+
+    points = []
+    node = (0, 'top', 0)
+    visited = set()
+
+    while node not in visited:
+        i, level, side = node
+        odd = twists[i] % 2
+
+        # through the column...
+        if level == 'top':
+            column = strand(i, side)
+            end = (i, 'bottom', side ^ odd)
+        else:
+            column = list(reversed(strand(i, side ^ odd)))
+            end = (i, 'top', side ^ odd)
+
+        visited.update((node, end))
+        points.extend(column[:-1])
+
+        # ...and along the join at its other end
+        node, path = joins[end]
+        points.extend(path[:-1])
+
+    if len(visited) != 4 * len(twists):
+        raise ValueError('P%s is a link, not a knot' % (twists,))
+
+    return _diagram(points)
+
+
+def twist_knot(n):
+    """Twist knot with n half twists (n + 2 crossings): P(n, 1, 1)."""
+    return pretzel_knot(n, 1, 1)
+
+
+def _crosses_near_start(vertices, distance):
+    """Whether two segments of the closed polygon cross within ``distance``
+    of its first vertex."""
+    lines = [Line(a, b) for a, b in zip(vertices, vertices[1:])]
+    grid = SegmentGrid()
+
+    for j, line in enumerate(lines):
+        for i in grid.candidates(line):
+            # the first and the last segment meet at the first vertex
+            if i < j - 1 and (i, j) != (0, len(lines) - 1) and lines[i].intersects(line) and \
+               lines[i].intersection(line).distance(vertices[0]) <= distance:
+                return True
+
+        grid.append(line)
+
+    return False
+
+
+def random_walk(steps, seed=0, step=20.0):
+    """Closed random polygonal walk with random crossings.
+
+    KnotModel ignores crossings within 3 pixels of the first vertex, so
+    walks with crossings near it are drawn again: they would not be valid
+    diagrams."""
+    r = random.Random(seed)
+
+    while True:
+        x = y = 0.0
+        vertices = []
+
+        for k in xrange(steps):
+            vertices.append(Point(x, y))
+            angle = r.uniform(0, 2 * math.pi)
+            x = x + step * math.cos(angle)
+            y = y + step * math.sin(angle)
+
+        vertices.append(vertices[0])
+        over = [r.random() < 0.5 for v in vertices]
+
+        if not _crosses_near_start(vertices, 2 * 3.0):
+            return vertices, over
+
+
+def _torus_for(crossings):
+    # T(3, q) has 2q crossings; q must not be a multiple of 3
+    q = max(crossings // 2, 1)
+
+    return torus_knot(3, q + 1 if q % 3 == 0 else q)
+
+
+# Generators by name, as functions of the approximate number of crossings
+GENERATORS = {
+    'torus': _torus_for,
+    'twist': lambda crossings: twist_knot(max(crossings - 2, 1)),
+    'pretzel': lambda crossings: pretzel_knot(*([max(crossings // 3, 1) | 1] * 3)),
+    'random': lambda crossings: random_walk(max(crossings, 8)),
+}
@@ -0,0 +1,227 @@
+# encoding: utf-8
+"""Scaling benchmarks for KnotModel.
+
+For every generator and size a fresh child process builds the diagram and
+times the operations below, each one with the model cache cleared, so every
+timing includes everything the operation depends on. The child reports its
+peak resident memory when it's done. Results are written as JSON and can be
+compared against a previous run::
+
+    python -m benchmarks.run -o baseline.json
+    python -m benchmarks.run --compare baseline.json
+
+A case that takes longer than --timeout is stopped: the operations it did
+not finish are reported as null."""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+from knoteasy.core import KnotModel
+from benchmarks.generators import GENERATORS
+
+OPERATIONS = [
+    ('set_vertices', lambda model, data: model.set_vertices(*data)),
+    ('append_vertex', lambda model, data: _append_all(model, data)),
+    ('get_trail', lambda model, data: model.get_trail()),
+    ('get_arcs', lambda model, data: model.get_arcs()),
+    ('gauss_code', lambda model, data: model.gauss_code()),
+    ('dowker_notation', lambda model, data: model.dowker_notation()),
+    ('wirtinger_presentation', lambda model, data: model.wirtinger_presentation()),
+    ('is_tricolorable', lambda model, data: model.is_tricolorable()),
+]
+
+DEFAULT_SIZES = (16, 64, 256, 1024, 4096)
+
+
+def _append_all(model, data):
+    model.set_vertices([])
+
+    for v, over in zip(*data):
+        model.append_vertex(v, over)
+
+
+def _run_case(connection, generator, size, repeat, operations):
+    data = GENERATORS[generator](size)
+    model = KnotModel()
+    model.set_vertices(*data)
+    connection.send(('size', len(model.crossings), len(model.segments)))
+
+    for name, operation in OPERATIONS:
+        if name not in operations:
+            continue
+
+        best = None
+
+        for i in xrange(repeat):
+            # a new revision drops every cached result
+            model.revision += 1
+
+            start = time.time()
+            operation(model, data)
+            elapsed = time.time() - start
+
+            best = elapsed if best is None else min(best, elapsed)
+
+        connection.send(('time', name, best))
+
+    connection.send(('done', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    connection.close()
+
+
+def run_case(generator, size, repeat=3, timeout=300, operations=None):
+    if operations is None:
+        operations = [name for name, operation in OPERATIONS]
+
+    result = {'generator': generator,
+              'size': size,
+              'crossings': None,
+              'segments': None,
+              'times': dict((name, None) for name in operations),
+              'max_rss_kb': None}
+
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=_run_case,
+                                      args=(sender, generator, size, repeat, operations))
+    process.start()
+    sender.close()
+    deadline = time.time() + timeout
+
+    try:
+        while True:
+            remaining = deadline - time.time()
+
+            if remaining <= 0 or not receiver.poll(remaining):
+                result['timeout'] = True
+                break
+
+            try:
+                message = receiver.recv()
+            except EOFError:
+                result['error'] = 'benchmark process exited with code %s' % process.exitcode
+                break
+
+            if message[0] == 'size':
+                result['crossings'], result['segments'] = message[1:]
+            elif message[0] == 'time':
+                result['times'][message[1]] = message[2]
+            else:
+                result['max_rss_kb'] = message[1]
+                break
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+    return result
+
+
+def run(generators, sizes, repeat=3, timeout=300, operations=None, log=None):
+    results = []
+
+    for generator in generators:
+        for size in sizes:
+            result = run_case(generator, size, repeat, timeout, operations)
+            results.append(result)
+
+            if log is not None:
+                log(result)
+
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results}
+
+
+def compare(baseline, current, threshold=1.25, noise=0.005):
+    """Returns the (generator, size, operation, old, new) entries at least
+    ``threshold`` times slower than in the baseline, memory included.
+    Differences under ``noise`` seconds are ignored."""
+    old_results = dict(((r['generator'], r['size']), r) for r in baseline['results'])
+    regressions = []
+
+    for result in current['results']:
+        old = old_results.get((result['generator'], result['size']))
+
+        if old is None:
+            continue
+
+        values = [(name, old['times'].get(name), t, noise) for name, t in result['times'].iteritems()]
+        values.append(('max_rss_kb', old['max_rss_kb'], result['max_rss_kb'], 0))
+
+        for name, old_value, new_value, margin in values:
+            if old_value is None:
+                continue
+
+            # a timeout or a missing value is always a regression
+            if new_value is None or (new_value > threshold * old_value and
+                                     new_value - old_value > margin):
+                regressions.append((result['generator'], result['size'], name, old_value, new_value))
+
+    return regressions
+
+
+def _print_result(result):
+    times = ' '.join('%s=%s' % (name, '%.4f' % t if t is not None else '--')
+                     for name, t in sorted(result['times'].iteritems()))
+    sys.stdout.write('%-8s %6d  crossings=%s segments=%s max_rss_kb=%s %s%s\n' % (
+        result['generator'], result['size'], result['crossings'], result['segments'],
+        result['max_rss_kb'], times, ' TIMEOUT' if result.get('timeout') else ''))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark KnotModel on synthetic diagrams.')
+    parser.add_argument('-g', '--generators', default=','.join(sorted(GENERATORS)),
+                        help='comma separated list of generators, from: %s' % ', '.join(sorted(GENERATORS)))
+    parser.add_argument('-s', '--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated list of approximate numbers of crossings')
+    parser.add_argument('-O', '--operations', default=','.join(name for name, operation in OPERATIONS),
+                        help='comma separated list of operations to time')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='runs of every operation, the best one is kept')
+    parser.add_argument('-t', '--timeout', type=float, default=300,
+                        help='seconds allowed for every generator and size')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    parser.add_argument('-c', '--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown reported as a regression (default: 1.25)')
+    args = parser.parse_args(argv)
+
+    generators = [g for g in args.generators.split(',') if g]
+    unknown = [g for g in generators if g not in GENERATORS]
+
+    if unknown:
+        parser.error('unknown generators: %s' % ', '.join(unknown))
+
+    operations = [name for name in args.operations.split(',') if name]
+    unknown = [name for name in operations if name not in dict(OPERATIONS)]
+
+    if unknown:
+        parser.error('unknown operations: %s' % ', '.join(unknown))
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = run(generators, sizes, args.repeat, args.timeout, operations, _print_result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(baseline, results, args.threshold)
+
+        for generator, size, name, old, new in regressions:
+            sys.stdout.write('REGRESSION %s %d %s: %s -> %s\n' % (generator, size, name, old, new))
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# encoding: utf-8
+"""Fox n-colorings and the determinant of a knot.
+
+All the information about the n-colorings of a diagram is contained in the
+Smith normal form of its coloring matrix (one row per crossing, one column
+per arc, ``2 * overstrand - understrand_incoming - understrand_leaving``).
+The normal form is computed once with integer-only row and column
+operations and every question about colorings is answered from its
+diagonal."""
+
+
+def _gcd(a, b):
+    a, b = abs(a), abs(b)
+
+    while b:
+        a, b = b, a % b
+
+    return a
+
+
+def _min_entry(matrix, t):
+    best = None
+
+    for i in xrange(t, len(matrix)):
+        for j in xrange(t, len(matrix[i])):
+            x = matrix[i][j]
+
+            if x and (best is None or abs(x) < abs(matrix[best[0]][best[1]])):
+                best = (i, j)
+
+                if abs(x) == 1:
+                    return best
+
+    return best
+
+
+def _dense_smith_form(matrix):
+    rows = len(matrix)
+    columns = len(matrix[0]) if matrix else 0
+    factors = []
+    t = 0
+
+    while t < min(rows, columns):
+        pivot = _min_entry(matrix, t)
+
+        if pivot is None:
+            break
+
+        i, j = pivot
+        matrix[t], matrix[i] = matrix[i], matrix[t]
+        for row in matrix:
+            row[t], row[j] = row[j], row[t]
+
+        while True:
+            p = matrix[t][t]
+            reduced = True
+
+            for i in xrange(t + 1, rows):
+                if matrix[i][t]:
+                    q = matrix[i][t] // p
+                    matrix[i] = [x - q * y for x, y in zip(matrix[i], matrix[t])]
+                    reduced = reduced and not matrix[i][t]
+
+            for j in xrange(t + 1, columns):
+                if matrix[t][j]:
+                    q = matrix[t][j] // p
+                    for row in matrix:
+                        row[j] = row[j] - q * row[t]
+                    reduced = reduced and not matrix[t][j]
+
+            if not reduced:
+                # a remainder smaller than the pivot is left: use it instead
+                i, j = min([(abs(matrix[i][t]), i, t) for i in xrange(t + 1, rows) if matrix[i][t]] +
+                           [(abs(matrix[t][j]), t, j) for j in xrange(t + 1, columns) if matrix[t][j]])[1:]
+                matrix[t], matrix[i] = matrix[i], matrix[t]
+                for row in matrix:
+                    row[t], row[j] = row[j], row[t]
+                continue
+
+            # the pivot must divide every entry left in the submatrix
+            bad_row = None
+            for i in xrange(t + 1, rows):
+                for j in xrange(t + 1, columns):
+                    if matrix[i][j] % p:
+                        bad_row = i
+                        break
+                if bad_row is not None:
+                    break
+
+            if bad_row is None:
+                break
+
+            matrix[t] = [x + y for x, y in zip(matrix[t], matrix[bad_row])]
+
+        factors.append(abs(matrix[t][t]))
+        t = t + 1
+
+    return factors
+
+
+def smith_normal_form(matrix, columns):
+    """Returns the diagonal of the Smith normal form of an integer matrix.
+
+    ``matrix`` is a list of rows with ``columns`` entries each. The result
+    has ``min(len(matrix), columns)`` non-negative entries, each dividing the
+    next one, with the zeros (if any) at the end."""
+    rows = {}
+    column_rows = {}
+
+    for i, row in enumerate(matrix):
+        rows[i] = dict((j, x) for j, x in enumerate(row) if x)
+        for j in rows[i]:
+            column_rows.setdefault(j, set()).add(i)
+
+    units = 0
+    pivoted = True
+
+    # Coloring matrices are sparse and full of +-1 entries: eliminate those
+    # on the sparse representation first, each one is a unit invariant factor
+    while pivoted:
+        pivoted = False
+
+        for i in sorted(rows):
+            if i not in rows:
+                continue
+
+            row = rows[i]
+            candidates = [j for j, x in row.iteritems() if abs(x) == 1]
+
+            if not candidates:
+                continue
+
+            j = min(candidates, key=lambda c: len(column_rows[c]))
+            u = row[j]
+
+            for k in column_rows[j] - set([i]):
+                other = rows[k]
+                q = other[j] * u
+
+                for c, x in row.iteritems():
+                    value = other.get(c, 0) - q * x
+
+                    if value:
+                        other[c] = value
+                        column_rows[c].add(k)
+                    elif c in other:
+                        del other[c]
+                        column_rows[c].discard(k)
+
+            # the column operations clearing the rest of row i do not touch
+            # any other row, so the row and the column can simply be dropped
+            for c in row:
+                column_rows[c].discard(i)
+            del column_rows[j]
+            del rows[i]
+
+            units = units + 1
+            pivoted = True
+
+    remaining_columns = sorted(c for c in column_rows if column_rows[c])
+    dense = [[rows[i].get(c, 0) for c in remaining_columns]
+             for i in sorted(rows) if rows[i]]
+
+    factors = [1] * units + _dense_smith_form(dense)
+
+    return factors + [0] * (min(len(matrix), columns) - len(factors))
+
+
+class FoxColorings(object):
+
+    def __init__(self, arcs, matrix):
+        self.arcs = arcs
+        self.invariant_factors = smith_normal_form(matrix, len(arcs))
+
+    def number_of_colorings(self, n):
+        count = n ** (len(self.arcs) - len(self.invariant_factors))
+
+        for d in self.invariant_factors:
+            count = count * (_gcd(d, n) if d else n)
+
+        return count
+
+    def is_colorable(self, n):
+        # there are always n constant colorings
+        return n > 1 and self.number_of_colorings(n) > n
+
+    def determinant(self):
+        zeros = len([d for d in self.invariant_factors if d == 0])
+        zeros = zeros + len(self.arcs) - len(self.invariant_factors)
+
+        # the coloring matrix of a knot always has nullity one
+        if zeros > 1:
+            return 0
+
+        det = 1
+        for d in self.invariant_factors:
+            if d:
+                det = det * d
+
+        return det
+
+    def colorable_moduli(self, limit):
+        return [n for n in xrange(2, limit + 1) if self.is_colorable(n)]
@@ -1,43 +1,108 @@
 # encoding: utf-8
+import array
+import bisect
+import contextlib
+import functools
+import hashlib
+import itertools
 import math
 
+from knoteasy import notation, polynomials, profiling
+from knoteasy.coloring import FoxColorings
+
 def ccw(A,B,C):
     return (C.y-A.y)*(B.x-A.x) > (B.y-A.y)*(C.x-A.x)
 
-# TODO - si los arcos, puntos, etc. se hicieran no mutables e
-# implementaran __hash__() seguramente se podria mejorar el desempeño
-# o utilizar diccionarios mas a menudo para hacer todo mas 'evidente'
+def _nullspace_mod(matrix, columns, p):
+    """Returns a basis of the null space of ``matrix`` over GF(p).
 
-# TODO - optimizar esta funcion: no todas las posibles coloraciones son
-# validas (y esto lo sabemos aun antes de verificar)
-# i.e. coloraciones que usan menos de 3 colores
-def _possible_colorings(data):
-    
-    data = list(data)
-    colorings = []
-    
-    if len(data) == 1:
-        for i in (0, 1, 2):
-            colorings.append([i])
-    else:
-        data.remove(data[0])
-        
-        _colorings = _possible_colorings(data)
-        
-        for i in (0, 1, 2):
-            for x in _colorings:
-                new_coloring = [i]
-                new_coloring.extend(x)
-                colorings.append(new_coloring)
+    ``matrix`` is a list of rows with ``columns`` integer entries each and
+    ``p`` must be prime. The reduction is done on a copy of the matrix."""
+    rows = [[x % p for x in row] for row in matrix]
+    pivots = []
+    r = 0
+
+    for col in xrange(0, columns):
+        pivot_row = None
+
+        for i in xrange(r, len(rows)):
+            if rows[i][col]:
+                pivot_row = i
+                break
+
+        if pivot_row is None:
+            continue
+
+        rows[r], rows[pivot_row] = rows[pivot_row], rows[r]
+        inverse = pow(rows[r][col], p - 2, p)
+        rows[r] = [(x * inverse) % p for x in rows[r]]
+
+        for i in xrange(0, len(rows)):
+            if i != r and rows[i][col]:
+                factor = rows[i][col]
+                rows[i] = [(x - factor * y) % p for x, y in zip(rows[i], rows[r])]
+
+        pivots.append(col)
+        r = r + 1
+
+        if r == len(rows):
+            break
+
+    basis = []
+    pivot_set = set(pivots)
+
+    for free in xrange(0, columns):
+        if free in pivot_set:
+            continue
+
+        vector = [0] * columns
+        vector[free] = 1
+
+        for i, col in enumerate(pivots):
+            vector[col] = (-rows[i][free]) % p
+
+        basis.append(vector)
+
+    return basis
+
+
+class _Value(object):
+    """Base class for the immutable, hashable objects of a diagram.
+
+    Attributes are declared in ``__slots__`` by the subclasses and can only
+    be set from ``__init__`` through ``_set``."""
+
+    __slots__ = ()
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s objects are immutable' % type(self).__name__)
 
-    return colorings
+    def __delattr__(self, name):
+        raise AttributeError('%s objects are immutable' % type(self).__name__)
 
+    # objects pickled before __slots__ were used carry their __dict__
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[-1]
 
-class Point(object):
+        for name, value in state.iteritems():
+            self._set(name, value)
+
+    def __ne__(self, obj):
+        return not (self == obj)
+
+
+class Point(_Value):
+
+    __slots__ = ('x', 'y')
     
+    # integer coordinates would make Line.intersection() floor-divide
     def __init__(self, x = 0.0, y = 0.0):
-        self.x = x
-        self.y = y
+        self._set('x', float(x))
+        self._set('y', float(y))
         
     def distance(self, p2):
         return math.sqrt(math.pow((self.x - p2.x), 2) +
@@ -53,16 +118,21 @@ class Point(object):
         if isinstance(obj, Point):
             return self.x == obj.x and self.y == obj.y
         return False
-    
-    def __ne__(self, obj):
-        return not (self == obj)
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
+
+class Line(_Value):
 
-class Line(object):
+    __slots__ = ('orig', 'dest')
     
     def __init__(self, orig, dest):
-        self.orig = orig
-        self.dest = dest
+        self._set('orig', orig)
+        self._set('dest', dest)
 
 
     def get_direction_vector(self):
@@ -99,64 +169,63 @@ class Line(object):
         if isinstance(obj, Line):
             return self.orig == obj.orig and self.dest == obj.dest
         return False
-    
-    def __ne__(self, obj):
-        return not (self == obj)    
+
+    def __hash__(self):
+        return hash((self.orig, self.dest))
+
+    def __reduce__(self):
+        return (Line, (self.orig, self.dest))
 
     def __repr__(self):
         return '[%s - %s]' % (self.orig, self.dest)
 
 
-class Arc(object):
+class Arc(_Value):
+
+    __slots__ = ('segments', '_hash')
     
-    def __init__(self, s0):
-        self.segments = []
-        self.add(s0)
+    def __init__(self, s0, *segments):
+        arc_segments = [s0]
+        known = set(arc_segments)
+
+        for segment in segments:
+            if segment not in known:
+                last_segment = arc_segments[-1]
+
+                if last_segment.orig == segment.dest:
+                    arc_segments.insert(0, segment)
+                    known.add(segment)
+                elif last_segment.dest == segment.orig:
+                    arc_segments.append(segment)
+                    known.add(segment)
+
+        self._set('segments', tuple(arc_segments))
+        self._set('_hash', hash(self.segments))
         
     def add(self, segment):
-        if not self.segments:
-            self.segments.append(segment)
-        
-        if segment not in self.segments:
-            last_segment = self.segments[-1]
-
-            if last_segment.orig == segment.dest:
-                self.segments.insert(0, segment)
-            elif last_segment.dest == segment.orig:
-                self.segments.append(segment)
+        return Arc(*(self.segments + (segment,)))
                 
     def join(self, arc):
-        new_arc = Arc(self.segments[0])
-        
-        for s in self.segments[1:]:
-            new_arc.add(s)
+        if self.segments[0].orig == arc.segments[-1].dest:
+            return Arc(*(self.segments + tuple(reversed(arc.segments))))
+        elif self.segments[-1].dest == arc.segments[0].orig:
+            return Arc(*(self.segments + arc.segments))
                 
-        if new_arc.segments[0].orig == arc.segments[-1].dest:
-            for s in reversed(arc.segments):
-                new_arc.add(s)
-        elif new_arc.segments[-1].dest == arc.segments[0].orig:
-            for s in arc.segments:
-                new_arc.add(s)
-                
-        return new_arc
+        return self
     
     # two arcs are considered the same if they are constructed from the same
     # segments
     def __eq__(self, obj):
         if isinstance(obj, Arc):
-            if len(self.segments) != len(obj.segments):
-                return False
-            
-            for i in xrange(0, len(self.segments)):
-                if self.segments[i] != obj.segments[i]:
-                    return False
-            
-            return True
+            return self._hash == obj._hash and self.segments == obj.segments
         
         return False
-    
-    def __ne__(self, obj):
-        return not (self == obj)    
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (Arc, self.segments)
 
     def __repr__(self):
         return '[%d segments from %s to %s]' % (len(self.segments),
@@ -164,14 +233,17 @@ class Arc(object):
        
 
 
-class Crossing(object):
+class Crossing(_Value):
+
+    __slots__ = ('under', 'over', 'crosspoint', '_sign')
     
-    def __init__(self, under, over):
-        self.under = under
-        self.over = over
-        self.crosspoint = under.intersection(over)
+    def __init__(self, under, over, crosspoint=None, sign=None):
+        self._set('under', under)
+        self._set('over', over)
+        self._set('crosspoint', crosspoint if crosspoint is not None else under.intersection(over))
+        self._set('_sign', sign if sign is not None else self._compute_orientation())
     
-    def get_orientation(self):
+    def _compute_orientation(self):
         x1 = self.over.orig.x - self.over.dest.x
         y1 = self.over.orig.y - self.over.dest.y
         x2 = self.under.orig.x - self.under.dest.x
@@ -185,14 +257,17 @@ class Crossing(object):
             return -1
         else:
             return 0
+
+    def get_orientation(self):
+        return self._sign
         
     def sign(self):
-        return self.get_orientation()
+        return self._sign
         
+    # crossings are immutable: this returns the crossing with the strands
+    # swapped
     def under_to_over(self):
-        temp = self.over
-        self.over = self.under
-        self.under = temp
+        return Crossing(self.over, self.under, self.crosspoint, -self._sign)
         
     def involves(self, line):
         return self.under == line or self.over == line
@@ -201,24 +276,269 @@ class Crossing(object):
         if isinstance(obj, Crossing):
             return self.under == obj.under and self.over == obj.over
         return False
-    
-    def __ne__(self, obj):
-        return not (self == obj)    
+
+    def __hash__(self):
+        return hash((self.under, self.over))
+
+    def __reduce__(self):
+        return (Crossing, (self.under, self.over, self.crosspoint))
         
     def __repr__(self):
-        return '{%s%s}' % ('+' if self.get_orientation() == 1 else '-', self.crosspoint)
+        return '{%s%s}' % ('+' if self._sign == 1 else '-', self.crosspoint)
 
 
-def _sort_crossings(x, y):
-    dx = x[0]
-    dy = y[0]
-    
-    if dx < dy:
-        return -1
-    elif dx > dy:
-        return 1
-    
-    return 0
+class SegmentGrid(object):
+    """Uniform grid over the segments of a diagram.
+
+    Segments are identified by their position in ``KnotModel.segments`` and
+    registered in every cell they pass through, so only segments sharing a
+    cell with a new one have to be tested for intersection. The cell size
+    follows the mean segment length and the grid is rebuilt (at most once
+    every time the number of segments doubles) when it drifts too much.
+
+    Segments shorter than MIN_CELL_SIZE (duplicated vertices) don't decide
+    the cell size, and a segment spanning more than MAX_SPAN cells makes
+    the grid coarser before it is walked."""
+
+    MIN_REBUILD_SIZE = 64
+    MIN_CELL_SIZE = 1.0
+    MAX_SPAN = 32
+
+    def __init__(self, cell_size=None):
+        self._fixed_cell_size = cell_size
+        self.clear()
+
+    def clear(self):
+        self.cell_size = self._fixed_cell_size
+        self._cells = {}
+        self._segments = []
+        self._segment_cells = []
+        self._total_length = 0.0
+        self._next_rebuild = self.MIN_REBUILD_SIZE
+        self._sized = self._fixed_cell_size is not None
+        self._extent = 0.0
+
+    def _cells_of(self, line):
+        size = self.cell_size
+        eps = size * 1e-9
+        min_x, max_x = min(line.orig.x, line.dest.x), max(line.orig.x, line.dest.x)
+        min_y, max_y = min(line.orig.y, line.dest.y), max(line.orig.y, line.dest.y)
+        first_column = int(math.floor((min_x - eps) / size))
+        last_column = int(math.floor((max_x + eps) / size))
+
+        if first_column == last_column or min_x == max_x:
+            return [(i, j) for i in xrange(first_column, last_column + 1)
+                    for j in xrange(int(math.floor((min_y - eps) / size)),
+                                    int(math.floor((max_y + eps) / size)) + 1)]
+
+        # walk the columns crossed by the segment, taking the range of rows
+        # it covers inside each one
+        slope = float(line.dest.y - line.orig.y) / (line.dest.x - line.orig.x)
+        cells = []
+
+        for i in xrange(first_column, last_column + 1):
+            left = max(min_x, i * size)
+            right = min(max_x, (i + 1) * size)
+            y0 = line.orig.y + (left - line.orig.x) * slope
+            y1 = line.orig.y + (right - line.orig.x) * slope
+
+            for j in xrange(int(math.floor((min(y0, y1) - eps) / size)),
+                            int(math.floor((max(y0, y1) + eps) / size)) + 1):
+                cells.append((i, j))
+
+        return cells
+
+    def _insert(self, index, line):
+        cells = self._cells_of(line)
+
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(index)
+
+        return cells
+
+    def _rebuild(self, cell_size):
+        self.cell_size = max(cell_size, self._extent / self.MAX_SPAN)
+        self._cells = {}
+        self._segment_cells = [self._insert(i, l) for i, l in enumerate(self._segments)]
+
+    # the first segment that isn't degenerate decides the cell size, and
+    # the grid gets coarser for lines spanning too many cells
+    def _fit(self, line):
+        if self._fixed_cell_size is not None:
+            return
+
+        length = line.orig.distance(line.dest)
+        extent = max(abs(line.dest.x - line.orig.x), abs(line.dest.y - line.orig.y))
+
+        if not self._sized and length >= self.MIN_CELL_SIZE:
+            self._sized = True
+            self._rebuild(2.0 * length)
+        elif self.cell_size is None:
+            self.cell_size = self.MIN_CELL_SIZE
+
+        if extent > self.MAX_SPAN * self.cell_size:
+            self._rebuild(2.0 * length)
+
+    def append(self, line):
+        self._fit(line)
+        self._extent = max(self._extent, abs(line.dest.x - line.orig.x), abs(line.dest.y - line.orig.y))
+        self._segments.append(line)
+        self._total_length += line.orig.distance(line.dest)
+        self._segment_cells.append(self._insert(len(self._segments) - 1, line))
+
+        if not self._sized:
+            return
+
+        if self._fixed_cell_size is None and len(self._segments) >= self._next_rebuild:
+            self._next_rebuild = 2 * len(self._segments)
+            wanted = max(2.0 * self._total_length / len(self._segments), self.MIN_CELL_SIZE)
+
+            if not (self.cell_size / 4.0 <= wanted <= self.cell_size * 4.0):
+                self._rebuild(wanted)
+
+    def pop(self):
+        line = self._segments.pop()
+        self._total_length -= line.orig.distance(line.dest)
+
+        for cell in self._segment_cells.pop():
+            bucket = self._cells[cell]
+            bucket.pop()
+
+            if not bucket:
+                del self._cells[cell]
+
+    def candidates(self, line):
+        """Returns the sorted indexes of the segments that may intersect
+        ``line``."""
+        if not self._segments:
+            return []
+
+        self._fit(line)
+        found = set()
+        cells = self._cells
+
+        for cell in self._cells_of(line):
+            if cell in cells:
+                found.update(cells[cell])
+
+        return sorted(found)
+
+
+class _SortedCrossings(object):
+    """Crossings along one segment, sorted by distance to its origin.
+
+    Every entry also remembers the position of the other segment involved in
+    the crossing. Crossings at the same distance keep their insertion
+    order."""
+
+    def __init__(self):
+        self.keys = []
+        self.crossings = []
+        self.others = []
+
+    def insert(self, key, crossing, other):
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.crossings.insert(i, crossing)
+        self.others.insert(i, other)
+
+    # same result as inserting the (key, crossing, other) entries in order
+    def extend(self, entries):
+        entries = sorted(zip(self.keys, self.crossings, self.others) + list(entries),
+                         key=lambda entry: entry[0])
+        self.keys = [entry[0] for entry in entries]
+        self.crossings = [entry[1] for entry in entries]
+        self.others = [entry[2] for entry in entries]
+
+    def remove(self, crossing):
+        for i, c in enumerate(self.crossings):
+            if c is crossing:
+                del self.keys[i]
+                del self.crossings[i]
+                del self.others[i]
+                return
+
+    def replace(self, old, new):
+        for i, c in enumerate(self.crossings):
+            if c is old:
+                self.crossings[i] = new
+                return
+
+    def __len__(self):
+        return len(self.crossings)
+
+
+class Trail(object):
+    """The passages through crossings along a diagram, in parallel arrays.
+
+    For every passage ``crossings`` has the number of the crossing (from 0,
+    in order of first appearance), ``over`` whether the knot goes over it
+    and ``segments`` the position of the segment it is on (-1 for diagrams
+    without geometry). ``signs`` and ``objects`` have the sign and the
+    Crossing object of every crossing.
+
+    The passages split the knot into len(self) + 1 pieces, the first and
+    the last being the same arc: passage k goes from piece k to piece k + 1.
+    ``arcs`` has the number of the arc of every piece, from 0 in order of
+    appearance (arcs end at undercrossings).
+
+    Iterating gives (crossing, over) pairs, as knoteasy.notation expects."""
+
+    __slots__ = ('crossings', 'over', 'segments', 'signs', 'objects', 'arcs')
+
+    # passages are (crossing, over, segment) triples
+    def __init__(self, passages):
+        self.crossings = array.array('i')
+        self.over = array.array('b')
+        self.segments = array.array('i')
+        self.signs = array.array('b')
+        self.objects = []
+        numbers = {}
+
+        for crossing, over, segment in passages:
+            number = numbers.get(id(crossing))
+
+            if number is None:
+                number = numbers[id(crossing)] = len(self.objects)
+                self.objects.append(crossing)
+                self.signs.append(crossing.sign())
+
+            self.crossings.append(number)
+            self.over.append(over)
+            self.segments.append(segment)
+
+        self.arcs = array.array('i', [0])
+        arc = 0
+
+        for over in self.over:
+            if not over:
+                arc = (arc + 1) % len(self.objects)
+
+            self.arcs.append(arc)
+
+    def __len__(self):
+        return len(self.crossings)
+
+    def __iter__(self):
+        return itertools.izip(self.crossings, self.over)
+
+    def strands(self):
+        """Yields (crossing, overstrand, understrand incoming, understrand
+        leaving) for every crossing, in order, with the arc numbers."""
+        overstrands = array.array('i', [0]) * len(self.objects)
+        incoming = array.array('i', [0]) * len(self.objects)
+        leaving = array.array('i', [0]) * len(self.objects)
+
+        for k, (c, over) in enumerate(self):
+            if over:
+                overstrands[c] = self.arcs[k]
+            else:
+                incoming[c] = self.arcs[k]
+                leaving[c] = self.arcs[k + 1]
+
+        for c in xrange(len(self.objects)):
+            yield c, overstrands[c], incoming[c], leaving[c]
+
 
 #def gauss_code_to_dowker(gauss_code):
 #    dowker = {}
@@ -259,391 +579,582 @@ def _sort_crossings(x, y):
 
 
 
-# TODO - Si 'cacheamos' la informacion de los cruces (indice), etc. cada vez que 
-# agregan cruces todo seria mas eficiente.
-# Tal vez hasta el get_crossings_index() podria cambiarse por algo como
-# enuemrate(get_crossings(), 1) si los devuelve ya ordenados
+def _cached(method):
+    """Memoizes a KnotModel method until the model revision changes.
+
+    Cached results are shared between callers and must not be modified."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._cache_revision != self.revision:
+            self._cache = {}
+            self._cache_revision = self.revision
+
+        key = (name,) + args + tuple(sorted(kwargs.items()))
+
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = method(self, *args, **kwargs)
+            return value
+
+    return wrapper
+
+
+def _persistent(method):
+    """Looks up (and stores) the results of a KnotModel method for finished
+    diagrams in the model persistent_cache, if it has one (see
+    knoteasy.diskcache).
+
+    It goes between _cached and _instrumented. Results must not depend on
+    the coordinates of the diagram, only on KnotModel.diagram_key()."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.persistent_cache
+
+        if cache is None or not self.is_done():
+            return method(self, *args, **kwargs)
+
+        key = name
+
+        if args or kwargs:
+            key = '%s%r' % (name, args + tuple(sorted(kwargs.items())))
+
+        found, value = cache.get(self.diagram_key(), key)
+
+        if not found:
+            value = method(self, *args, **kwargs)
+            cache.put(self.diagram_key(), key, value)
+
+        return value
+
+    return wrapper
+
+
+def _instrumented(method):
+    """Reports the calls of a KnotModel method to the model profiler (see
+    knoteasy.profiling)."""
+    code = method.__code__
+    key = (code.co_filename, code.co_firstlineno, method.__name__)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+
+        if not profiler.enabled:
+            return method(self, *args, **kwargs)
+
+        profiler.start(key)
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profiler.stop(*self._profile_sizes())
+
+    return wrapper
+
+
 class KnotModel(object):
 
-    def __init__(self, vertices=[]):
+    # shared by all the models unless one is given its own
+    profiler = profiling.profiler
+    
+    # a knoteasy.diskcache.InvariantCache, shared the same way
+    persistent_cache = None
+
+    # backend is 'python' or 'numpy' (see knoteasy.numeric)
+    def __init__(self, vertices=[], over=None, backend='python'):
+        self.backend = backend
         self.vertices = []
         self.segments = []
         self.crossings = []
+        
+        if backend == 'numpy':
+            from knoteasy.numeric import SegmentArray
+            self._segment_grid = SegmentArray()
+        elif backend == 'python':
+            self._segment_grid = SegmentGrid()
+        else:
+            raise ValueError('unknown backend: %s' % backend)
+        
+        self._segment_crossings = []
+        self._segment_index = {}
+        self.revision = 0
+        self._cache = {}
+        self._cache_revision = 0
+        self._batch_depth = 0
+        self._batch_changed = False
         self._listeners = {'model-changed': [],
                            'vertex-added': [],
                            'crossings-added': [],
                            'segment-added': []}
-        self.set_vertices(vertices)
+        self.set_vertices(vertices, over)
 
-    def set_vertices(self, vertices):
+    # over, if given, has the 'over' flag of append_vertex() for every vertex
+    @_instrumented
+    def set_vertices(self, vertices, over=None):
+        if over is None:
+            over = [True] * len(vertices)
+        elif len(over) != len(vertices):
+            raise ValueError('%d vertices but %d over flags' % (len(vertices), len(over)))
+        
+        # the whole diagram is intersected at once
+        if self.backend == 'numpy':
+            from knoteasy.numeric import diagram_crossings
+            self._restore(vertices, diagram_crossings(vertices, over))
+            return
+        
+        with self.batch():
+            self._clear()
+            
+            for v, v_over in zip(vertices, over):
+                self.append_vertex(v, v_over)
+    
+    def _clear(self):
         self.vertices = []
         self.segments = []
         self.crossings = []
+        self._segment_grid.clear()
+        self._segment_crossings = []
+        self._segment_index = {}
+        self._emit('model-changed', self)
+    
+    # rebuilds a model from known crossings without any intersection test.
+    # crossings are (under segment, over segment, crosspoint[, sign]) tuples,
+    # in the order they were created by append_vertex()
+    @_instrumented
+    def _restore(self, vertices, crossings):
+        with self.batch():
+            self._clear()
+            self.vertices = list(vertices)
+            
+            for orig, dest in zip(self.vertices, self.vertices[1:]):
+                self._add_segment(Line(orig, dest))
+            
+            entries = [[] for s in self.segments]
+            
+            for entry in crossings:
+                under, over, crosspoint = entry[:3]
+                c = Crossing(self.segments[under], self.segments[over], *entry[2:])
+                
+                for i, other in ((under, over), (over, under)):
+                    entries[i].append((crosspoint.distance(self.segments[i].orig), c, other))
+                
+                self.crossings.append(c)
+            
+            for segment_crossings, segment_entries in zip(self._segment_crossings, entries):
+                segment_crossings.extend(segment_entries)
+    
+    # an independent copy of the model: it doesn't change when this one does,
+    # so it can be used from another thread
+    @_instrumented
+    def snapshot(self):
+        model = KnotModel(backend=self.backend)
+        model._restore(self.vertices, self._crossing_entries())
+        return model
+    
+    # (under segment, over segment, crosspoint, sign) of every crossing, in
+    # the order expected by _restore()
+    def _crossing_entries(self):
+        positions = {}
+        
+        for i, segment_crossings in enumerate(self._segment_crossings):
+            for c, other in zip(segment_crossings.crossings, segment_crossings.others):
+                if c.under == self.segments[i]:
+                    positions[id(c)] = (i, other)
+        
+        return [positions[id(c)] + (c.crosspoint, c.sign()) for c in self.crossings]
+    
+    @staticmethod
+    def write_corpus(path, models, crossings=True):
+        """Writes the models to a binary corpus file (see knoteasy.corpus).
 
-        if not vertices:
-            self._emit('model-changed', self)
+        With crossings=False only the vertices are stored."""
+        from knoteasy.corpus import write_corpus
+        write_corpus(path, models, crossings)
+    
+    @staticmethod
+    def read_corpus(path):
+        """Returns a memory-mapped knoteasy.corpus.Corpus: a sequence of models."""
+        from knoteasy.corpus import Corpus
+        return Corpus(path)
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups several modifications of the model.
+
+        No events are emitted inside the block; a single 'model-changed' is
+        emitted when the outermost block ends if anything changed."""
+        self._batch_depth += 1
         
-        for v in vertices:
-            self.append_vertex(v)
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            
+            if self._batch_depth == 0 and self._batch_changed:
+                self._batch_changed = False
+                self._notify('model-changed', self)
             
+    @_instrumented
     def remove_last_vertex(self):
         if self.vertices:
             self.vertices.pop()
             
             if self.segments:
-                involved_crossings = self.get_crossings_involving_line(self.segments.pop())
+                segment = self.segments.pop()
+                self._segment_grid.pop()
                 
-                for c in involved_crossings:
-                    self.crossings.remove(c)
+                if self._segment_index.get(segment) == len(self.segments):
+                    del self._segment_index[segment]
+                
+                # all of them were created with the segment, so they are
+                # the last ones in self.crossings
+                segment_crossings = self._segment_crossings.pop()
+                
+                for c, other in zip(segment_crossings.crossings, segment_crossings.others):
+                    self._segment_crossings[other].remove(c)
+                
+                del self.crossings[len(self.crossings) - len(segment_crossings):]
             
             self._emit('model-changed', self)
             
+    @_instrumented
     def append_vertex(self, v, over=True):
         if not self.vertices:
             self.vertices.append(v)
             self._emit('vertex-added', v)
         else:
             ghost_line = Line(self.vertices[-1], v)
+            intersected = self._intersected_segments(ghost_line)
             
-            if not self._line_intersects_segment(ghost_line):
+            if not intersected:
                 self.vertices.append(v)
                 self._emit('vertex-added', v)
                 
-                self.segments.append(ghost_line)
+                self._add_segment(ghost_line)
                 self._emit('segment-added', ghost_line)
             else:
                 new_crossings = []
+                ghost_crossings = _SortedCrossings()
+                ghost_index = len(self.segments)
                 
-                for s in self.segments[:-1]:
-                    if ghost_line.intersects(s):
-                        c = Crossing(s, ghost_line)
-                        
-                        if not over:
-                            c.under_to_over()
-                        
-                        # TODO FIXME wtf
-                        if c.crosspoint.distance(self.vertices[0]) > 3:
-                            new_crossings.append(c)
+                for i in intersected:
+                    s = self.segments[i]
+                    c = Crossing(s, ghost_line)
+                    
+                    if not over:
+                        c = c.under_to_over()
+                    
+                    # TODO FIXME wtf
+                    if c.crosspoint.distance(self.vertices[0]) > 3:
+                        new_crossings.append(c)
+                        self._segment_crossings[i].insert(c.crosspoint.distance(s.orig), c, ghost_index)
+                        ghost_crossings.insert(c.crosspoint.distance(ghost_line.orig), c, i)
                         
                 self.vertices.append(v)
                 self._emit('vertex-added', v)
                 
-                self.segments.append(ghost_line)
+                self._add_segment(ghost_line, ghost_crossings)
                 self._emit('segment-added', ghost_line)
                 
                 self.crossings.extend(new_crossings)
                 self._emit('crossings-added', new_crossings)
         
+    # every crossing with its strands swapped: no intersection is computed
+    @_instrumented
     def mirror_image(self):
-        mirror_model = KnotModel(self.vertices)
-        
-        for crossing in mirror_model.crossings:
-            orig_crossing = self.get_crossing_of(crossing.under, crossing.over)
-            
-            if orig_crossing is not None and \
-               orig_crossing.under == crossing.under:
-                crossing.under_to_over()
-
+        mirror_model = KnotModel(backend=self.backend)
+        mirror_model._restore(self.vertices, [(over, under, crosspoint, -sign)
+                                              for under, over, crosspoint, sign in self._crossing_entries()])
         return mirror_model
     
+    @_instrumented
     def make_alternating(self):
         if self.crossings and not self.is_alternating():
             n = 0
+            positions = dict((c, i) for i, c in enumerate(self.crossings))
             
-            for s in self.segments:
-                crossings = self.get_crossings_involving_line(s)
-                
-                for c in crossings:
-                    if n == 0 and c.over != s:
-                        c.under_to_over()
-                    elif n == 1 and c.under != s:
-                        c.under_to_over()
+            for i, s in enumerate(self.segments):
+                for c in self._segment_crossings[i].crossings:
+                    if (n == 0 and c.over != s) or (n == 1 and c.under != s):
+                        position = positions.pop(c)
+                        self._replace_crossing(position, c.under_to_over())
+                        positions[self.crossings[position]] = position
                         
                     n = (n + 1) % 2
 
             self._emit('model-changed', self)
     
+    # the same crossings on the reversed segments. Reversing both strands
+    # keeps the sign of a crossing, and for a finished diagram the initial
+    # vertex (see append_vertex()) is the same
+    @_instrumented
     def orientation_reversed(self):
-        reversed_ = KnotModel()
+        last = len(self.segments) - 1
+        entries = [(last - under, last - over, crosspoint, sign)
+                   for under, over, crosspoint, sign in self._crossing_entries()]
         
-        for v in reversed(self.vertices):
-            reversed_.append_vertex(v)
-            
-        for c in reversed_.crossings:
-            orig_crossing = self.get_crossing_of(c.under.reversed(),
-                                                 c.over.reversed())
-            
-            if orig_crossing is not None:
-                if c.over != orig_crossing.over.reversed():
-                    c.under_to_over()
-
+        # in the order append_vertex() would create them: by the segment
+        # added last and then by the other one
+        entries.sort(key=lambda entry: (max(entry[:2]), min(entry[:2])))
+        
+        reversed_ = KnotModel(backend=self.backend)
+        reversed_._restore(list(reversed(self.vertices)), entries)
         return reversed_
 
     # cruces con numero par por encima son negativos
+    @_cached
+    @_persistent
+    @_instrumented
     def dowker_notation(self):
-        crossings_indexes = {}
-        
-        for index, (c, over) in enumerate(self.get_crossings_trail(), 1):
-            if c not in crossings_indexes:
-                crossings_indexes[c] = [0,0]
-            
-            if over and index % 2 == 0:
-                crossings_indexes[c][1] = -index
-            elif index % 2 == 0:
-                crossings_indexes[c][1] = index
+        trail = self.get_trail_columns()
+        odd = array.array('i', [0]) * len(trail.objects)
+        even = array.array('i', [0]) * len(trail.objects)
+
+        for index, (c, over) in enumerate(trail, 1):
+            if index % 2:
+                odd[c] = index
             else:
-                crossings_indexes[c][0] = index
-        
-        indexes = crossings_indexes.values()
-        indexes.sort(cmp=lambda x,y: abs(x[0]) - abs(y[0]))
+                even[c] = -index if over else index
 
-        return [i[1] for i in indexes]
-    
+        return [even[c] for c in sorted(xrange(len(odd)), key=odd.__getitem__)]
+
+    # the same for every start, orientation and (with mirror=True) mirror
+    # image of the diagram, see knoteasy.notation. A tuple, usable as a key
+    @_cached
+    @_persistent
+    @_instrumented
+    def canonical_dowker_notation(self, mirror=True, simplify=False):
+        if simplify:
+            return self.simplified().canonical_dowker_notation(mirror)
+
+        return notation.canonical_dowker(self.get_trail_columns(), mirror)
+
+    @_cached
+    @_persistent
+    @_instrumented
     def gauss_code(self):
-        code = []
-        crossings_index = self.get_crossings_index()
-        
-        for c, over in self.get_crossings_trail():
-            if over:
-                code.append(crossings_index.index(c))
-            else:
-                code.append(crossings_index.index(c) * -1)
-        
-        return code
-    
+        return [c + 1 if over else -c - 1 for c, over in self.get_trail_columns()]
+
+    @_cached
+    @_persistent
+    @_instrumented
     def extended_gauss_code(self):
         gauss_code = self.gauss_code()
-        
-        return [gauss_code, ['+' if c.sign() > 0 else '-' for c in self.get_crossings()]]    
-    
+
+        return [gauss_code, ['+' if sign > 0 else '-' for sign in self.get_trail_columns().signs]]
+
+    # identifies the diagram up to its coordinates: a hash of the crossings
+    # trail with the over/under flags and the signs of the crossings
+    @_cached
+    @_instrumented
+    def diagram_key(self):
+        trail = self.get_trail_columns()
+        passages = ['%d%s%+d' % (c, 'o' if over else 'u', trail.signs[c]) for c, over in trail]
+
+        return hashlib.sha1(' '.join(passages)).hexdigest()
+
+    # the passages through crossings along the knot, see Trail. Everything
+    # else about the trail is built from it
+    @_cached
+    @_instrumented
+    def get_trail_columns(self):
+        return Trail((c, c.over == s, i) for i, s in enumerate(self.segments)
+                     for c in self._segment_crossings[i].crossings)
+
+    # (u's', segment) and (u'c', crossing, over) items: every segment is
+    # repeated after each crossing on it
+    def iter_trail(self):
+        trail = self.get_trail_columns()
+        k = 0
+
+        for i, s in enumerate(self.segments):
+            yield (u's', s)
+
+            while k < len(trail) and trail.segments[k] == i:
+                yield (u'c', trail.objects[trail.crossings[k]], bool(trail.over[k]))
+                yield (u's', s)
+                k = k + 1
+
+    @_cached
+    @_instrumented
     def get_trail(self):
-        trail = []
+        return list(self.iter_trail())
 
-        for s in self.segments:
-            trail.append((u's', s))
-            segment_crossings = self.get_crossings_involving_line(s)
-                
-            for c in segment_crossings:
-                trail.append((u'c', c, c.over == s))
-                trail.append((u's', s))
-                        
-        return trail
-    
+    @_cached
+    @_instrumented
     def get_crossings_trail(self):
-        return [(c[1], c[2]) for c in self.get_trail() if c[0] == 'c']
-    
-    # Si los arcos no son state-less y el join() cambia *ambos* arcos -o algo asi-
-    # toda esta logica seria minima pues los arcos tendrian "memoria"
-    def _join_arcs(self, arc_index, data):
-        if arc_index < len(data):
-            arc = data[arc_index][1]
-        
-            if len(data) > arc_index + 1:
-                if data[arc_index + 1][0] == 'c' and data[arc_index + 1][2] == True:
-                    other_arc = data[arc_index + 2][1]
-                    new_arc = arc.join(other_arc)
-                    
-                    for i, x in enumerate(data):
-                        if x[0] == 'a' and (x[1] == arc or x[1] == other_arc):
-                            data[i] = ('a', new_arc)
-                    
-                    return self._join_arcs(arc_index + 2, data)
-        
-        return data
+        trail = self.get_trail_columns()
+        return [(trail.objects[c], bool(over)) for c, over in trail]
 
-    
+    # arcs and crossings alternate, starting and ending with an arc
+    @_cached
+    @_instrumented
     def get_arcs_trail(self):
-        data = self.get_subarcs_trail_data()
-#
-#        # Join subarcs passing OVER a crossing
-        for i in xrange(0, len(data)):
-            if data[i][0] == 'a':
-                data = self._join_arcs(i, data)
-                
-        # Join first and last subarcs
-        first_arc = data[0][1]
-        last_arc = data[-1][1]
-        new_arc = data[-1][1].join(data[0][1])
-        
-        for i, x in enumerate(data):
-            if x[0] == 'a' and (x[1] == first_arc or x[1] == last_arc):
-                data[i] = ('a', new_arc)
-                
+        arcs = self.get_arcs()
+
+        if not arcs:
+            return []
+
+        trail = self.get_trail_columns()
+        data = [('a', arcs[trail.arcs[0]])]
+
+        for k, (c, over) in enumerate(trail):
+            data.append((u'c', trail.objects[c], bool(over)))
+            data.append(('a', arcs[trail.arcs[k + 1]]))
+
         return data
-    
+
+    # the arc of every piece of the trail (see Trail.arcs) is made of the
+    # pieces up to its undercrossing, in trail order
+    @_cached
+    @_instrumented
     def get_arcs(self):
-        arcs = []
-        
-        for data in self.get_arcs_trail():
-            if data[0] == 'a' and data[1] not in arcs:
-                arcs.append(data[1])
-        
-        return arcs
-    
-    def get_subarcs_trail_data(self):
-        if self.segments:
-            trail = self.get_trail()
-            
-            # Add a virtual crossing
-            trail.append(('c', None, False))
-            
-            arc_trail_data = []            
-            trail_accum = []
-
-            for e in trail:
-                if e[0] == 'c':
-                    trail_accum.append(e)
-                    arc_trail_data.append(trail_accum)                    
-                    trail_accum = [e]
-                else:
-                    trail_accum.append(e)
-            
-            arc_trail_data[-1].pop()
-            
-            arc_trail = []
-            for ad in arc_trail_data:
-                # starts and ends with a crossing
-                if ad[0][0] == 'c' and ad[-1][0] == 'c':
-                    if len(ad) == 3:
-                        arc_trail.append(ad[0])
-                        arc_trail.append(('a', Arc(Line(ad[0][1].crosspoint,
-                                                        ad[-1][1].crosspoint))))
-                        arc_trail.append(ad[-1])
-                    else:
-                        arc = Arc(Line(ad[0][1].crosspoint,
-                                       ad[1][1].orig))
-                        
-                        for t, l in ad[1:-3]:
-                            arc.add(l)
-                            
-                        arc.add(Line(ad[-3][1].orig, ad[-1][1].crosspoint))
-                        
-                        arc_trail.append(ad[0])
-                        arc_trail.append(('a', arc))
-                        arc_trail.append(ad[-1])
-
-                # starts with a crossing
-                elif ad[0][0] == 'c':
-                    if len(ad) == 2:
-                        arc_trail.append(ad[0])
-                        arc_trail.append(('a', Arc(Line(ad[0][1].crosspoint,
-                                                        ad[1][1].dest))))
-                    else:
-                        arc = Arc(Line(ad[0][1].crosspoint,
-                                       ad[1][1].dest))
-                        
-                        for t, l in ad[1:]:
-                            arc.add(l)
-                        
-                        arc_trail.append(ad[0])
-                        arc_trail.append(('a', arc))  
-
-                # ends with a crossing
-                elif ad[-1][0] == 'c':
-                    if len(ad) == 2:
-                        arc_trail.append(('a', Arc(Line(ad[0][1].orig,
-                                                        ad[-1][1].crosspoint))))
-                        arc_trail.append(ad[-1])
-                    else:
-                        arc = Arc(ad[0][1])
-                        
-                        for t, l in ad[1:-3]:
-                            arc.add(l)
-                            
-                        arc.add(Line(ad[-2][1].orig,
-                                     ad[-1][1].crosspoint))
-                        
-                        arc_trail.append(('a', arc))
-                        arc_trail.append(ad[-1])
-                # only segments (trivial knot)
-                else:
-                    arc = Arc(ad[0][1])
-                        
-                    for t, l in ad[1:]:
-                        arc.add(l)
+        if not self.segments:
+            return []
 
-                    arc_trail.append(('a', arc))
-                    
-        arc_trail_res = []
-        
-        for i, d in enumerate(arc_trail[:-1]):
-            if d[0] == 'c' and arc_trail[i + 1][1] == d[1]:
-                continue
+        trail = self.get_trail_columns()
+        runs = [[]]
+
+        for k, piece in enumerate(self._pieces()):
+            if k and not trail.over[k - 1]:
+                runs.append([])
+
+            runs[-1].extend(piece.segments)
+
+        # the last piece and the first one are the same arc
+        if len(runs) > 1:
+            runs[0] = runs.pop() + runs[0]
+
+        return [Arc(*segments) for segments in runs]
+
+    # the pieces (subarcs) of the knot between consecutive crossings
+    @_instrumented
+    def _pieces(self):
+        trail = self.get_trail_columns()
+        segments = self.segments
+
+        if not len(trail):
+            return [Arc(*segments)]
+
+        points = [trail.objects[c].crosspoint for c in trail.crossings]
+
+        # from the first vertex to the first crossing
+        first = segments[:trail.segments[0] + 1]
+
+        if len(first) == 1:
+            pieces = [Arc(Line(first[0].orig, points[0]))]
+        else:
+            pieces = [Arc(*([first[0]] + first[1:-2] + [Line(first[-1].orig, points[0])]))]
+
+        for k in xrange(1, len(trail)):
+            middle = segments[trail.segments[k - 1]:trail.segments[k] + 1]
+
+            if len(middle) == 1:
+                pieces.append(Arc(Line(points[k - 1], points[k])))
             else:
-                arc_trail_res.append(d)
+                pieces.append(Arc(*([Line(points[k - 1], middle[0].orig)] + middle[:-2] +
+                                    [Line(middle[-2].orig, points[k])])))
 
-        arc_trail_res.append(arc_trail[-1])
+        # from the last crossing to the last vertex
+        last = segments[trail.segments[-1]:]
 
-        return arc_trail_res
-    
+        if len(last) == 1:
+            pieces.append(Arc(Line(points[-1], last[0].dest)))
+        else:
+            pieces.append(Arc(*([Line(points[-1], last[0].dest)] + last)))
+
+        return pieces
+
+    # pieces and crossings alternate, starting and ending with a piece
+    @_cached
+    @_instrumented
+    def get_subarcs_trail_data(self):
+        if not self.segments:
+            return []
+
+        trail = self.get_trail_columns()
+        pieces = self._pieces()
+        data = [('a', pieces[0])]
+
+        for k, (c, over) in enumerate(trail):
+            data.append((u'c', trail.objects[c], bool(over)))
+            data.append(('a', pieces[k + 1]))
+
+        return data
+
+    @_cached
+    @_instrumented
     def get_crossings_index(self):
-        indexes = [None,]
-        
-        for c, over in self.get_crossings_trail():
-            if c not in indexes:
-                indexes.append(c)
-                
-        return indexes
-    
+        return [None] + self.get_trail_columns().objects
+
+    @_cached
+    @_instrumented
     def get_crossings(self):
-        return [c for c in self.get_crossings_index() if c is not None]
-        
+        return list(self.get_trail_columns().objects)
+
+    @_cached
+    @_instrumented
     def get_crossings_arc_info(self):
         info = {}
-        arcs_trail = self.get_arcs_trail()
-                
-        for i, item in enumerate(arcs_trail):
-            if item[0] == 'c':
-                
-                if item[1] not in info:
-                    info[item[1]] = {'index': len(info) + 1,
-                                     'crossing': item[1],
-                                     'overstrand': None,
-                                     'understrand-incoming': None,
-                                     'understrand-leaving': None}
-                
-                crossing_info = info[item[1]]
-                
-                if item[2] == True:
-                    crossing_info['overstrand'] = arcs_trail[i - 1][1]
-                else:
-                    crossing_info['understrand-incoming'] = arcs_trail[i - 1][1]
-                    crossing_info['understrand-leaving'] = arcs_trail[i + 1][1]
-                
+        trail = self.get_trail_columns()
+        arcs = self.get_arcs()
+
+        for c, overstrand, incoming, leaving in trail.strands():
+            crossing = trail.objects[c]
+            info[crossing] = {'index': c + 1,
+                              'crossing': crossing,
+                              'overstrand': arcs[overstrand],
+                              'understrand-incoming': arcs[incoming],
+                              'understrand-leaving': arcs[leaving]}
+
         return info
-    
-    def wirtinger_presentation(self):
+
+    @_cached
+    @_persistent
+    @_instrumented
+    def wirtinger_presentation(self, simplify=False):
+        if simplify:
+            return self.simplified().wirtinger_presentation()
+
         generators = []
         relations = []
-        
+
         if len(self.crossings) >= 1:
-            arcs = self.get_arcs()
+            trail = self.get_trail_columns()
 
-            generators.extend(xrange(1, len(arcs) + 1))
-            
-            for crossing, info in self.get_crossings_arc_info().iteritems():
-                overstrand_index = arcs.index(info['overstrand']) + 1
-                understrand_incoming_index = arcs.index(info['understrand-incoming']) + 1
-                understrand_leaving_index = arcs.index(info['understrand-leaving']) + 1
-
-                if crossing.sign() < 0:
-                    relation = [understrand_leaving_index,
-                                overstrand_index,
-                                understrand_incoming_index,
-                                -1 * overstrand_index]
+            # generators are the arcs, from 1
+            generators.extend(xrange(1, len(trail.objects) + 1))
+
+            for c, overstrand, incoming, leaving in trail.strands():
+                if trail.signs[c] < 0:
+                    relation = [leaving + 1, overstrand + 1, incoming + 1, -overstrand - 1]
                 else:
-                    relation = [understrand_leaving_index,
-                                -1 * overstrand_index,
-                                understrand_incoming_index,
-                                overstrand_index] 
-                
+                    relation = [leaving + 1, -overstrand - 1, incoming + 1, overstrand + 1]
+
                 relations.append(relation)
         else:
             generators = [1]
             relations = []
-            
+
         return {'generators': generators,
                 'relations': relations}
+    
+    # the Wirtinger presentation reduced with Tietze moves (see
+    # knoteasy.presentation): a dict with 'generators' and 'relators'
+    @_cached
+    @_persistent
+    @_instrumented
+    def simplified_presentation(self, simplify=False):
+        if self.is_done():
+            from knoteasy.presentation import simplify_wirtinger
+            return simplify_wirtinger(self.wirtinger_presentation(simplify))
+        
+        return None
             
                      
     def is_done(self):
@@ -651,6 +1162,9 @@ class KnotModel(object):
             return self.vertices[0] == self.vertices[-1]
         return False
     
+    @_cached
+    @_persistent
+    @_instrumented
     def is_alternating(self):
         gauss_code = self.gauss_code()
         
@@ -661,44 +1175,162 @@ class KnotModel(object):
         
         return True
     
-    def is_tricolorable(self):
+    @_cached
+    @_instrumented
+    def coloring_matrix(self):
+        arcs = self.get_arcs()
+        matrix = []
+
+        for c, overstrand, incoming, leaving in self.get_trail_columns().strands():
+            row = [0] * len(arcs)
+            row[overstrand] += 2
+            row[incoming] -= 1
+            row[leaving] -= 1
+            matrix.append(row)
+
+        return arcs, matrix
+
+    # colorings are the solutions of the coloring matrix over GF(3), with
+    # a color per arc of get_arcs()
+    @_cached
+    @_persistent
+    @_instrumented
+    def _tricolorings_basis(self):
+        arcs, matrix = self.coloring_matrix()
+        return _nullspace_mod(matrix, len(arcs), 3)
+
+    @_cached
+    @_instrumented
+    def is_tricolorable(self, simplify=False):
+        if simplify:
+            return self.simplified().is_tricolorable()
+
         if self.is_done() and len(self.crossings) >= 1:
             arcs = self.get_arcs()
-            
-            colorings = _possible_colorings([x for x in xrange(0, len(arcs))])
-            
-            for coloring in colorings:
-                coloring_data = []
-                
-                for arc in arcs:
-                    coloring_data.append({'arc': arc,
-                                          'color': coloring[arcs.index(arc)]})                
-                
-                if self.is_valid_coloring(coloring_data):
-                    return (True, coloring_data)
+            basis = self._tricolorings_basis()
+
+            # constant colorings are always solutions; any other basis
+            # vector uses all 3 colors
+            for coloring in basis:
+                if len(set(coloring)) == 3:
+                    return (True, [{'arc': arc, 'color': coloring[i]}
+                                   for i, arc in enumerate(arcs)])
 
-            return (False, None)
-            
-        
         return (False, None)
 
+    @_cached
+    @_persistent
+    @_instrumented
+    def number_of_tricolorings(self, simplify=False):
+        if simplify:
+            return self.simplified().number_of_tricolorings()
+
+        if self.is_done() and len(self.crossings) >= 1:
+            return 3 ** len(self._tricolorings_basis())
+
+        return 3
+
+    @_cached
+    @_instrumented
+    def fox_colorings(self):
+        if self.is_done():
+            arcs, matrix = self.coloring_matrix()
+            return FoxColorings(arcs, matrix)
+
+        return None
+
+    @_cached
+    @_persistent
+    @_instrumented
+    def get_determinant(self):
+        colorings = self.fox_colorings()
+
+        if colorings is not None:
+            return colorings.determinant()
+
+        return None
+
+    # an equivalent diagram with fewer crossings (see knoteasy.reidemeister).
+    # Methods taking a simplify argument compute their result on it
+    @_cached
+    @_instrumented
+    def simplified(self):
+        if self.is_done():
+            from knoteasy.reidemeister import simplify
+            return simplify(self)
+
+        return self
+
+    # names of the knots of the knot table the diagram may be (a single one
+    # when it is found by its canonical DT code), see knoteasy.knottable
+    @_cached
+    @_persistent
+    @_instrumented
+    def identify(self):
+        if self.is_done():
+            from knoteasy.knottable import get_table
+            return get_table().identify(self)
+        
+        return None
+
+    # polynomials are dicts {exponent: coefficient}, see knoteasy.polynomials
+    @_cached
+    @_persistent
+    @_instrumented
+    def kauffman_bracket(self):
+        if self.is_done():
+            return polynomials.kauffman_bracket(self.get_crossings_trail())
+
+        return None
+
+    @_cached
+    @_persistent
+    @_instrumented
+    def jones_polynomial(self, simplify=False):
+        if simplify:
+            return self.simplified().jones_polynomial()
+
+        bracket = self.kauffman_bracket()
+
+        if bracket is not None:
+            return polynomials.jones_from_bracket(bracket, self.get_writhe())
+
+        return None
+
+    @_cached
+    @_persistent
+    @_instrumented
+    def alexander_polynomial(self, simplify=False):
+        if simplify:
+            return self.simplified().alexander_polynomial()
+
+        if self.is_done():
+            return polynomials.alexander_polynomial(self.wirtinger_presentation())
+
+        return None
+
+    # quick screening: |Alexander polynomial at t|, up to powers of t
+    @_cached
+    @_persistent
+    @_instrumented
+    def alexander_value(self, t, simplify=False):
+        if simplify:
+            return self.simplified().alexander_value(t)
+
+        if self.is_done():
+            return polynomials.alexander_value(self.wirtinger_presentation(), t)
+
+        return None
+
     def is_valid_coloring(self, coloring):
        
         if len(set([x['color'] for x in coloring])) == 3:
+            colors = dict((x['arc'], x['color']) for x in coloring)
+            
             for crossing, info in self.get_crossings_arc_info().iteritems():
-                strands_color = []
-
-                for x in coloring:
-                    color = x['color']
-                    
-                    if x['arc'] == info['overstrand']:
-                        strands_color.append(color)
-
-                    if x['arc'] == info['understrand-incoming']:
-                        strands_color.append(color)
-                        
-                    if x['arc'] == info['understrand-leaving']:
-                        strands_color.append(color)
+                strands_color = [colors[info[strand]] for strand in
+                                 ('overstrand', 'understrand-incoming', 'understrand-leaving')
+                                 if info[strand] in colors]
                 
                 if len(strands_color) != 3:
                     raise Exception('ERROR')
@@ -711,51 +1343,85 @@ class KnotModel(object):
         return False
             
         
+    @_instrumented
     def get_crossing_of(self, line1, line2):
-        for c in self.crossings:
+        for c in self.get_crossings_involving_line(line1):
             if (c.under == line1 and c.over == line2) or \
                (c.under == line2 and c.over == line1):
                 return c
         
         return None
     
+    @_instrumented
     def get_crossings_involving_line(self, line):
-        crossings = []
+        index = self._segment_index.get(line)
         
-        for c in self.crossings:
-            if (c.involves(line)):
-                crossings.append((c.crosspoint.distance(line.orig), c))
-                
-        crossings.sort(cmp=_sort_crossings) # Sort crossings using distance from line initial point
+        if index is None or self.segments[index] != line:
+            for i, s in enumerate(self.segments):
+                if s == line:
+                    index = i
+                    break
+            else:
+                return []
         
-        res = []
-        for c in crossings:
-            res.append(c[1])
+        # sorted using distance from line initial point
+        return list(self._segment_crossings[index].crossings)
+    
+    def _replace_crossing(self, position, crossing):
+        old = self.crossings[position]
+        self.crossings[position] = crossing
+        self.revision += 1
         
-        return res
+        for segment in (old.under, old.over):
+            self._segment_crossings[self._segment_index[segment]].replace(old, crossing)
+    
+    def _add_segment(self, segment, crossings=None):
+        self._segment_index[segment] = len(self.segments)
+        self.segments.append(segment)
+        self._segment_crossings.append(crossings if crossings is not None else _SortedCrossings())
+        self._segment_grid.append(segment)
     
-    def _line_intersects_segment(self, line):
-        if len(self.vertices) < 2:
-            return False
+    # the last segment shares a vertex with any line appended after it
+    @_instrumented
+    def _intersected_segments(self, line):
+        last = len(self.segments) - 1
         
-        for s in self.segments[:-1]:
-            if s.intersects(line):
-                return True
-            
-        return False
+        return [i for i in self._segment_grid.candidates(line)
+                if i < last and self.segments[i].intersects(line)]
     
+    @_cached
+    @_instrumented
     def get_writhe(self):
         return sum([x.sign() for x in self.crossings])
 
+    # segments, crossings and arcs (if they were already computed)
+    def _profile_sizes(self):
+        arcs = None
+        
+        if self._cache_revision == self.revision and ('get_arcs',) in self._cache:
+            arcs = len(self._cache[('get_arcs',)])
+        
+        return len(self.segments), len(self.crossings), arcs
+
     def connect(self, event, callback):
         if event in self._listeners:
             self._listeners[event].append(callback)
             
+    # every event means the model has changed: cached data becomes stale
     def _emit(self, event, data):
         if event in self._listeners:
-            #log '%s:: %s' % (event, data)
-            for callback in self._listeners[event]:
-                callback(data)
+            self.revision += 1
+            
+            if self._batch_depth:
+                self._batch_changed = True
+                return
+            
+            self._notify(event, data)
             
             if event != 'model-changed':
-                self._emit('model-changed', self)
+                self._notify('model-changed', self)
+    
+    def _notify(self, event, data):
+        #log '%s:: %s' % (event, data)
+        for callback in self._listeners[event]:
+            callback(data)
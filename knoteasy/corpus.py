@@ -0,0 +1,209 @@
+# encoding: utf-8
+"""Compact binary storage for large collections of diagrams.
+
+A corpus file holds any number of diagrams as packed little-endian values:
+
+    header    magic 'KNOTCRP\\0', uint16 version, uint16 flags,
+              uint32 number of diagrams, uint64 offset of the index
+    diagram   uint32 number of vertices V, uint32 number of crossings C,
+              V pairs of float64 (x, y),
+              C entries of (uint32 under segment, uint32 over segment,
+                            float64 x, float64 y)
+    index     one uint64 offset per diagram
+
+Segment ``k`` goes from vertex ``k`` to vertex ``k + 1``. The crossing
+entries are stored in the order of KnotModel.crossings and carry the
+crosspoint, so a model is rebuilt without any intersection test. When
+C is NO_CROSSINGS the table was not stored: the diagram is rebuilt by
+appending its vertices one by one, every crossing going over.
+
+Files are read through mmap: only the diagrams actually requested are
+paged in, so corpora much larger than the available memory can be
+scanned."""
+import array
+import mmap
+import struct
+import sys
+
+from knoteasy.core import Point, KnotModel
+
+MAGIC = b'KNOTCRP\0'
+VERSION = 1
+NO_CROSSINGS = 0xffffffff
+
+_HEADER = struct.Struct('<8sHHIQ')
+_DIAGRAM = struct.Struct('<II')
+_CROSSING = struct.Struct('<IIdd')
+_OFFSET = struct.Struct('<Q')
+
+
+class CorpusError(Exception):
+    pass
+
+
+def _pack_doubles(values):
+    data = array.array('d', values)
+
+    if sys.byteorder == 'big':
+        data.byteswap()
+
+    return data.tostring()
+
+
+def _unpack_doubles(buf, offset, count):
+    data = array.array('d')
+    data.fromstring(buf[offset:offset + 8 * count])
+
+    if sys.byteorder == 'big':
+        data.byteswap()
+
+    return data
+
+
+class CorpusWriter(object):
+    """Writes diagrams to a new corpus file, one at a time."""
+
+    def __init__(self, path, crossings=True):
+        self.crossings = crossings
+        self._offsets = []
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    def add(self, model):
+        vertices = model.vertices
+        self._offsets.append(self._file.tell())
+
+        if not self.crossings:
+            self._file.write(_DIAGRAM.pack(len(vertices), NO_CROSSINGS))
+        else:
+            self._file.write(_DIAGRAM.pack(len(vertices), len(model.crossings)))
+
+        coordinates = []
+        for v in vertices:
+            coordinates.append(v.x)
+            coordinates.append(v.y)
+        self._file.write(_pack_doubles(coordinates))
+
+        if self.crossings:
+            # segment positions as recorded with every crossing: a segment
+            # can't be looked up by value, the same Line may appear twice
+            self._file.write(b''.join(
+                _CROSSING.pack(under, over, crosspoint.x, crosspoint.y)
+                for under, over, crosspoint, sign in model._crossing_entries()))
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        index_offset = self._file.tell()
+        self._file.write(b''.join(_OFFSET.pack(x) for x in self._offsets))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0, len(self._offsets), index_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Corpus(object):
+    """Read-only, memory-mapped access to a corpus file.
+
+    ``corpus[i]`` rebuilds the i-th diagram as a KnotModel and iterating
+    over the corpus yields every diagram in order. get_vertices() gives
+    the raw coordinates without building a model."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self._file.close()
+            raise CorpusError('%s: not a corpus file' % path)
+
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise CorpusError('%s: not a corpus file' % path)
+
+        magic, version, flags, count, index_offset = _HEADER.unpack_from(self._map, 0)
+
+        if magic != MAGIC:
+            self.close()
+            raise CorpusError('%s: not a corpus file' % path)
+
+        if version > VERSION:
+            self.close()
+            raise CorpusError('%s: unsupported corpus version %d' % (path, version))
+
+        self._count = count
+        self._index_offset = index_offset
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, i):
+        if i < 0:
+            i = i + self._count
+
+        if not 0 <= i < self._count:
+            raise IndexError('corpus index out of range')
+
+        return _OFFSET.unpack_from(self._map, self._index_offset + i * _OFFSET.size)[0]
+
+    def _read(self, i):
+        offset = self._offset(i)
+        n_vertices, n_crossings = _DIAGRAM.unpack_from(self._map, offset)
+        offset = offset + _DIAGRAM.size
+
+        coordinates = _unpack_doubles(self._map, offset, 2 * n_vertices)
+        offset = offset + 16 * n_vertices
+
+        if n_crossings == NO_CROSSINGS:
+            return coordinates, None
+
+        crossings = [_CROSSING.unpack_from(self._map, offset + k * _CROSSING.size)
+                     for k in xrange(n_crossings)]
+
+        return coordinates, crossings
+
+    def get_vertices(self, i):
+        coordinates = self._read(i)[0]
+        return zip(coordinates[0::2], coordinates[1::2])
+
+    def __getitem__(self, i):
+        coordinates, crossings = self._read(i)
+        vertices = [Point(x, y) for x, y in zip(coordinates[0::2], coordinates[1::2])]
+
+        if crossings is None:
+            return KnotModel(vertices)
+
+        model = KnotModel()
+        model._restore(vertices, [(under, over, Point(x, y)) for under, over, x, y in crossings])
+
+        return model
+
+    def __iter__(self):
+        for i in xrange(self._count):
+            yield self[i]
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_corpus(path, models, crossings=True):
+    with CorpusWriter(path, crossings) as writer:
+        for model in models:
+            writer.add(model)
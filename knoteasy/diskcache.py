@@ -0,0 +1,153 @@
+# encoding: utf-8
+"""Persistent cache of invariants in an SQLite file.
+
+Results are stored by diagram and by invariant. Diagrams are identified by
+KnotModel.diagram_key(), a hash of their combinatorial data (the crossings
+trail with the over/under flags and the signs of the crossings), so the
+same diagram drawn with other coordinates uses the same results. Values are
+pickled.
+
+When the total size of the stored values goes over ``max_size`` bytes the
+least recently used ones are removed. A file written with another
+SCHEMA_VERSION (that is, with values that may be computed differently) is
+emptied when it is opened.
+
+To use it::
+
+    KnotModel.persistent_cache = InvariantCache('invariants.sqlite')"""
+import cPickle
+import os
+import sqlite3
+import threading
+import time
+
+# bump it whenever the stored values change
+SCHEMA_VERSION = 1
+
+
+class InvariantCache(object):
+
+    def __init__(self, path, max_size=64 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._size = 0
+
+    def _connect(self):
+        # a connection can't be used after a fork: every process opens its own
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+
+            if row is None or int(row[0]) != SCHEMA_VERSION:
+                connection.execute('DROP TABLE IF EXISTS invariants')
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(SCHEMA_VERSION),))
+
+            connection.execute('CREATE TABLE IF NOT EXISTS invariants ('
+                               'diagram TEXT, name TEXT, value BLOB, size INTEGER, used REAL, '
+                               'PRIMARY KEY (diagram, name))')
+            connection.execute('CREATE INDEX IF NOT EXISTS invariants_used ON invariants (used)')
+
+        self._connection = connection
+        self._pid = os.getpid()
+        self._size = self._total_size()
+
+        return connection
+
+    def _total_size(self):
+        return self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM invariants').fetchone()[0]
+
+    def get(self, diagram, name):
+        """Returns (True, value) if the invariant is stored, (False, None)
+        otherwise."""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute('SELECT value FROM invariants WHERE diagram = ? AND name = ?',
+                                     (diagram, name)).fetchone()
+
+            if row is None:
+                return False, None
+
+            with connection:
+                connection.execute('UPDATE invariants SET used = ? WHERE diagram = ? AND name = ?',
+                                   (time.time(), diagram, name))
+
+        return True, cPickle.loads(str(row[0]))
+
+    def put(self, diagram, name, value):
+        data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+
+        # a single value can't fill the cache
+        if len(data) > self.max_size // 2:
+            return
+
+        with self._lock:
+            connection = self._connect()
+
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO invariants VALUES (?, ?, ?, ?, ?)',
+                                   (diagram, name, sqlite3.Binary(data), len(data), time.time()))
+
+            self._size = self._size + len(data)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    # removes the least recently used values, down to 3/4 of max_size
+    def _evict(self):
+        connection = self._connection
+        self._size = self._total_size()
+        excess = self._size - self.max_size * 3 // 4
+
+        if excess <= 0:
+            return
+
+        rows = connection.execute('SELECT rowid, size FROM invariants ORDER BY used').fetchall()
+        removed = []
+
+        for rowid, size in rows:
+            if excess <= 0:
+                break
+
+            removed.append((rowid,))
+            excess = excess - size
+
+        with connection:
+            connection.executemany('DELETE FROM invariants WHERE rowid = ?', removed)
+
+        self._size = self._total_size()
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM invariants').fetchone()[0]
+
+    def get_size(self):
+        """Total size of the stored values, in bytes."""
+        with self._lock:
+            self._connect()
+            return self._total_size()
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+
+            with connection:
+                connection.execute('DELETE FROM invariants')
+
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+
+            self._connection = None
@@ -0,0 +1,246 @@
+# encoding: utf-8
+"""Headless computation of invariants over collections of diagrams.
+
+Diagrams are read from JSON-lines or CSV input and the requested invariants
+are computed in a pool of worker processes. Results are written as JSON
+lines, one per input diagram and in input order.
+
+JSON-lines input has one object per line::
+
+    {"id": "trefoil", "vertices": [[x0, y0], [x1, y1], ...], "over": [...]}
+
+where ``over`` is optional and gives the 'over' flag used when appending
+each vertex (see KnotModel.append_vertex). CSV input has one diagram per
+row: an id followed by the flattened vertex coordinates ``x0, y0, x1, y1,
+...``. Closed diagrams repeat their first vertex at the end, just like
+KnotModel.vertices.
+
+With ``--cache`` the invariants are also kept in an SQLite file (see
+knoteasy.diskcache) and diagrams seen in earlier runs are not computed
+again.
+
+This module does not depend on GTK::
+
+    python -m knoteasy.engine -i crossings,writhe,tricolorability corpus.jsonl
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+
+from knoteasy.core import Point, KnotModel
+
+
+def _tricolorability(model):
+    tricolorable, coloring = model.is_tricolorable()
+
+    return {'tricolorable': tricolorable,
+            'colorings': model.number_of_tricolorings(),
+            'coloring': [x['color'] for x in coloring] if tricolorable else None}
+
+
+# polynomials are None for diagrams that aren't closed
+def _polynomial(p):
+    return sorted(p.items()) if p is not None else None
+
+
+INVARIANTS = {
+    'crossings': lambda model: len(model.crossings),
+    'arcs': lambda model: len(model.get_arcs()),
+    'alternating': lambda model: model.is_alternating(),
+    'writhe': lambda model: model.get_writhe(),
+    'gauss': lambda model: model.extended_gauss_code(),
+    'dowker': lambda model: model.dowker_notation(),
+    'canonical_dowker': lambda model: model.canonical_dowker_notation(),
+    'knot': lambda model: model.identify(),
+    'wirtinger': lambda model: model.wirtinger_presentation(),
+    'presentation': lambda model: model.simplified_presentation(),
+    'tricolorability': _tricolorability,
+    'jones': lambda model: _polynomial(model.jones_polynomial()),
+    'alexander': lambda model: _polynomial(model.alexander_polynomial()),
+}
+
+DEFAULT_INVARIANTS = ('crossings', 'arcs', 'alternating', 'writhe', 'gauss',
+                      'dowker', 'wirtinger', 'tricolorability', 'jones',
+                      'alexander')
+
+
+# Readers never raise on a malformed diagram: they yield a record with an
+# 'error' so that the output still has one line per input diagram
+def _invalid(record_id, e):
+    return {'id': record_id, 'error': '%s: %s' % (type(e).__name__, e)}
+
+
+def read_jsonl(lines):
+    for n, line in enumerate(lines):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        try:
+            data = json.loads(line)
+
+            if isinstance(data, list):
+                data = {'vertices': data}
+
+            yield {'id': data.get('id', n),
+                   'vertices': data['vertices'],
+                   'over': data.get('over')}
+        except (ValueError, KeyError, AttributeError) as e:
+            yield _invalid(n, e)
+
+
+def read_csv(lines):
+    for row in csv.reader(lines):
+        if not row or row[0].startswith('#'):
+            continue
+
+        try:
+            coordinates = [float(x) for x in row[1:] if x.strip()]
+
+            if len(coordinates) % 2:
+                raise ValueError('odd number of coordinates: %d' % len(coordinates))
+        except ValueError as e:
+            yield _invalid(row[0], e)
+            continue
+
+        yield {'id': row[0],
+               'vertices': zip(coordinates[0::2], coordinates[1::2]),
+               'over': None}
+
+
+READERS = {'jsonl': read_jsonl,
+           'csv': read_csv}
+
+
+def build_model(record, backend='python'):
+    return KnotModel([Point(float(x), float(y)) for x, y in record['vertices']],
+                     record.get('over'), backend)
+
+
+def compute_invariants(model, names=DEFAULT_INVARIANTS):
+    return dict((name, INVARIANTS[name](model)) for name in names)
+
+
+# every worker process opens the cache file on its first diagram
+def _use_cache(path):
+    cache = KnotModel.persistent_cache
+
+    if path is None:
+        KnotModel.persistent_cache = None
+    elif cache is None or cache.path != path:
+        from knoteasy.diskcache import InvariantCache
+        KnotModel.persistent_cache = InvariantCache(path)
+
+
+def _compute(args):
+    record, names, backend, simplify, cache = args
+
+    if 'error' in record:
+        return record
+
+    _use_cache(cache)
+
+    result = {'id': record['id']}
+
+    try:
+        model = build_model(record, backend)
+
+        if simplify:
+            model = model.simplified()
+
+        result.update(compute_invariants(model, names))
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+
+    return result
+
+
+def run(records, names=DEFAULT_INVARIANTS, processes=None, chunksize=16,
+        backend='python', simplify=False, cache=None):
+    """Yields the invariants of every record, in input order.
+
+    ``records`` can be any iterable (it is consumed lazily). With
+    ``processes=1`` everything is computed in the calling process.
+    ``backend`` is passed on to KnotModel. With ``simplify`` the invariants
+    are computed on KnotModel.simplified(). ``cache`` is the path of a
+    persistent invariant cache, if any."""
+    for name in names:
+        if name not in INVARIANTS:
+            raise ValueError('unknown invariant: %s' % name)
+
+    names = tuple(names)
+    tasks = ((record, names, backend, simplify, cache) for record in records)
+
+    if processes == 1:
+        for result in itertools.imap(_compute, tasks):
+            yield result
+        return
+
+    pool = multiprocessing.Pool(processes)
+
+    try:
+        for result in pool.imap(_compute, tasks, chunksize):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute knot invariants for a corpus of diagrams.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='input file (default: standard input)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: standard output)')
+    parser.add_argument('-f', '--format', choices=sorted(READERS),
+                        help='input format (default: guessed from the file name, jsonl otherwise)')
+    parser.add_argument('-i', '--invariants', default=','.join(DEFAULT_INVARIANTS),
+                        help='comma separated list of invariants, from: %s' % ', '.join(sorted(INVARIANTS)))
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('-c', '--chunksize', type=int, default=16,
+                        help='diagrams sent to a worker at a time')
+    parser.add_argument('-b', '--backend', choices=['python', 'numpy'], default='python',
+                        help='geometry backend (numpy must be installed for numpy)')
+    parser.add_argument('-s', '--simplify', action='store_true',
+                        help='reduce the diagrams with Reidemeister moves first')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='keep the invariants in this SQLite file across runs')
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.invariants.split(',') if name.strip()]
+    unknown = [name for name in names if name not in INVARIANTS]
+
+    if unknown:
+        parser.error('unknown invariants: %s' % ', '.join(unknown))
+
+    input_format = args.format
+
+    if input_format is None:
+        input_format = 'csv' if args.input.endswith('.csv') else 'jsonl'
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'rb')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'wb')
+
+    try:
+        records = READERS[input_format](input_file)
+
+        for result in run(records, names, args.processes, args.chunksize, args.backend,
+                          args.simplify, args.cache):
+            output_file.write(json.dumps(result) + '\n')
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
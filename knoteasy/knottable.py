@@ -0,0 +1,230 @@
+# encoding: utf-8
+"""Identification of knots from the standard prime knot tables.
+
+knots.txt has a line per prime knot up to 10 crossings (249 of them, plus
+the unknot) with its name, crossing number, determinant, Alexander
+polynomial and the canonical DT code (see knoteasy.notation) of its table
+diagram::
+
+    5_2 5 7 2,-3,2 4,8,10,2,6
+
+The Alexander polynomial is given by its coefficients, from the lowest to
+the highest degree, normalized as in knoteasy.polynomials. The file is
+only read the first time the table is used.
+
+A diagram whose canonical DT code is in the table is identified with a
+single dict lookup. Other diagrams of the same knot (e.g. before Reidemeister
+simplification, or after a flype) are narrowed down to the knots with the
+same determinant and Alexander polynomial and with no more crossings than
+the diagram. Mirror images are not told apart.
+
+The file is built from the KnotInfo database (https://knotinfo.org) with::
+
+    python -m knoteasy.knottable knotinfo_data_complete.csv"""
+import argparse
+import csv
+import os.path
+import re
+import sys
+
+from knoteasy.notation import canonical_dowker
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'knots.txt')
+
+
+class KnotTable(object):
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._knots = None
+
+    def _load(self):
+        if self._knots is not None:
+            return
+
+        knots = {}
+        by_dowker = {}
+        by_determinant = {}
+        by_alexander = {}
+
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+
+                fields = line.split()
+                name, crossings, determinant = fields[0], int(fields[1]), int(fields[2])
+                alexander = tuple(int(c) for c in fields[3].split(','))
+                dowker = tuple(int(a) for a in fields[4].split(',')) if len(fields) > 4 else ()
+
+                knots[name] = crossings
+                by_dowker[dowker] = name
+                by_determinant.setdefault(determinant, []).append(name)
+                by_alexander.setdefault(alexander, []).append(name)
+
+        self._by_dowker = by_dowker
+        self._by_determinant = by_determinant
+        self._by_alexander = by_alexander
+        self._knots = knots
+
+    def __len__(self):
+        self._load()
+        return len(self._knots)
+
+    def __contains__(self, name):
+        self._load()
+        return name in self._knots
+
+    def get_crossing_number(self, name):
+        self._load()
+        return self._knots[name]
+
+    def by_dowker(self, code):
+        """Name of the knot with this canonical DT code, or None."""
+        self._load()
+        return self._by_dowker.get(tuple(code))
+
+    def by_determinant(self, determinant):
+        self._load()
+        return list(self._by_determinant.get(determinant, []))
+
+    def by_alexander(self, polynomial):
+        """Knots with this Alexander polynomial (a dict, as returned by
+        KnotModel.alexander_polynomial())."""
+        self._load()
+        return list(self._by_alexander.get(_alexander_key(polynomial), []))
+
+    def identify(self, model):
+        """Names of the table knots the (finished) diagram may be.
+
+        The diagram is simplified first. A single name is returned if its
+        canonical DT code is in the table; otherwise all the knots with the
+        right determinant and Alexander polynomial and at most as many
+        crossings as the simplified diagram, by crossing number."""
+        self._load()
+        reduced = model.simplified()
+        code = reduced.canonical_dowker_notation()
+
+        # None for a trail that is not planar (a degenerate drawing)
+        name = self.by_dowker(code) if code is not None else None
+
+        if name is not None:
+            return [name]
+
+        alexander = reduced.alexander_polynomial()
+        determinant = abs(sum(c * (-1) ** (e % 2) for e, c in alexander.iteritems()))
+        candidates = set(self.by_alexander(alexander)) & set(self.by_determinant(determinant))
+
+        return sorted([name for name in candidates if self._knots[name] <= len(reduced.crossings)],
+                      key=_name_key)
+
+
+def _alexander_key(polynomial):
+    if not polynomial:
+        return (0,)
+
+    return tuple(polynomial.get(e, 0) for e in xrange(min(polynomial), max(polynomial) + 1))
+
+
+def _name_key(name):
+    return [int(x) if x.isdigit() else x for x in re.split(r'(\d+)', name)]
+
+
+_table = None
+
+
+def get_table():
+    """The table shipped with knoteasy, loaded on first use."""
+    global _table
+
+    if _table is None:
+        _table = KnotTable()
+
+    return _table
+
+
+# Building knots.txt from KnotInfo
+
+def _parse_alexander(text):
+    # KnotInfo writes polynomials like '2-3*t+ 2*t^2'
+    coefficients = {}
+
+    for sign, coefficient, t, exponent in re.findall(r'([+-]?)\s*(\d*)\s*\*?\s*(t?)(?:\^(\d+))?', text.replace(' ', '')):
+        if not coefficient and not t:
+            continue
+
+        c = int(coefficient) if coefficient else 1
+        e = (int(exponent) if exponent else 1) if t else 0
+        coefficients[e] = coefficients.get(e, 0) + (-c if sign == '-' else c)
+
+    p = [coefficients.get(e, 0) for e in xrange(max(coefficients) + 1)]
+
+    while not p[0]:
+        p.pop(0)
+
+    if sum(p) < 0:
+        p = [-c for c in p]
+
+    return p
+
+
+def dowker_trail(code):
+    """Passages (crossing, over) of the diagram with the DT code ``code``
+    (the even partners of 1, 3, 5..., negative when the even passage goes
+    over)."""
+    trail = [None] * (2 * len(code))
+
+    for i, a in enumerate(code):
+        trail[2 * i] = (i, a > 0)
+        trail[abs(a) - 1] = (i, a < 0)
+
+    return trail
+
+
+def build(rows, max_crossings=10):
+    """Lines of knots.txt for the KnotInfo rows (dicts) of the prime knots
+    with at most max_crossings crossings."""
+    lines = ['# name crossings determinant alexander canonical-dt']
+
+    for row in rows:
+        if not row['crossing_number'].isdigit() or int(row['crossing_number']) > max_crossings:
+            continue
+
+        code = [int(a) for a in re.findall(r'-?\d+', row['dt_notation'])]
+        dowker = canonical_dowker(dowker_trail(code))
+        alexander = _parse_alexander(row['alexander_polynomial'])
+
+        # |Alexander polynomial at -1| (KnotInfo has no determinant for the unknot)
+        determinant = abs(sum(c * (-1) ** e for e, c in enumerate(alexander)))
+
+        fields = [row['name'], row['crossing_number'], str(determinant),
+                  ','.join(map(str, alexander))]
+
+        if dowker:
+            fields.append(','.join(map(str, dowker)))
+
+        lines.append(' '.join(fields))
+
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the knot table from the KnotInfo data.')
+    parser.add_argument('input', help='knotinfo_data_complete.csv (from the database_knotinfo package)')
+    parser.add_argument('-o', '--output', default=DEFAULT_PATH)
+    parser.add_argument('-c', '--max-crossings', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with open(args.input) as f:
+        rows = list(csv.DictReader(f, delimiter='|'))
+
+    lines = build(rows, args.max_crossings)
+
+    with open(args.output, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    sys.stderr.write('%d knots written to %s\n' % (len(lines) - 1, args.output))
+
+
+if __name__ == '__main__':
+    main()
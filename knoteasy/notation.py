@@ -0,0 +1,80 @@
+# encoding: utf-8
+"""Canonical Dowker-Thistlethwaite codes.
+
+KnotModel.dowker_notation() depends on where the diagram starts and on its
+orientation. The canonical code is the smallest of the codes obtained
+starting at every passage through a crossing, in both directions and
+(optionally) for the mirror image too, so the same diagram drawn twice
+gives the same code.
+
+Codes are compared entry by entry, by absolute value first and then with
+positive values before negative ones. The mirror image only changes the
+signs, so for every start and direction the smaller of the two is the one
+whose first entry is positive.
+
+All candidates are built at the same time, one entry at a time, and only
+the ones that are still minimal are carried on to the next entry: each
+entry is computed in constant time from the passage positions, without
+building any trail."""
+
+
+def canonical_dowker(crossings_trail, mirror=True):
+    """Canonical DT code, as a tuple, of the diagram given by its passages
+    through crossings (as in KnotModel.get_crossings_trail(), or a
+    knoteasy.core.Trail).
+
+    Returns None if the trail is not the one of a planar diagram (a
+    crossing passed twice at odd, or even, positions)."""
+    n = len(crossings_trail)
+
+    if not n:
+        return ()
+
+    first = {}
+    partner = [None] * n
+    over = [bool(o) for c, o in crossings_trail]
+
+    for k, (c, o) in enumerate(crossings_trail):
+        if c in first:
+            partner[k] = first[c]
+            partner[first[c]] = k
+        else:
+            first[c] = k
+
+    if any(p is None or (p - k) % 2 == 0 for k, p in enumerate(partner)):
+        return None
+
+    # (start, direction, mirrored) of the candidates still minimal
+    alive = []
+
+    for start in xrange(n):
+        for direction in (1, -1):
+            q = partner[start]
+            alive.append((start, direction, mirror and over[q]))
+
+    code = []
+
+    for i in xrange(n // 2):
+        best = None
+        survivors = []
+
+        for candidate in alive:
+            start, direction, mirrored = candidate
+
+            # the passage labelled 2i + 1 and its (even) partner
+            p = (start + direction * 2 * i) % n
+            q = partner[p]
+            label = (direction * (q - start)) % n + 1
+            negative = over[q] != mirrored
+            key = (label, negative)
+
+            if best is None or key < best:
+                best = key
+                survivors = [candidate]
+            elif key == best:
+                survivors.append(candidate)
+
+        alive = survivors
+        code.append(-best[0] if best[1] else best[0])
+
+    return tuple(code)
@@ -0,0 +1,167 @@
+# encoding: utf-8
+"""NumPy backend for the geometry of a KnotModel.
+
+Segments are kept as rows ``(x0, y0, x1, y1)`` of a contiguous float64
+array, and the orientation tests of core.ccw(), Line.intersects(),
+Line.intersection() and Crossing.get_orientation() are evaluated for many
+segments at once, with the same arithmetic, so both backends build the
+same crossings (Point coordinates are always floats, so neither backend
+does integer division).
+
+NumPy is optional: importing this module always works, but the backend
+can only be used if numpy is installed (see available())."""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from knoteasy.core import Point
+
+# cells computed at once by diagram_crossings()
+_BLOCK = 1 << 22
+
+
+def available():
+    return numpy is not None
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('the numpy backend requires numpy')
+
+
+def _ccw(ax, ay, bx, by, cx, cy):
+    return (cy - ay) * (bx - ax) > (by - ay) * (cx - ax)
+
+
+def intersects(segments, lines):
+    """Vectorized Line.intersects(): ``segments`` and ``lines`` are arrays of
+    ``(x0, y0, x1, y1)`` rows that are broadcast against each other."""
+    ax, ay, bx, by = [segments[..., k] for k in xrange(4)]
+    cx, cy, dx, dy = [lines[..., k] for k in xrange(4)]
+
+    return (_ccw(ax, ay, cx, cy, dx, dy) != _ccw(bx, by, cx, cy, dx, dy)) & \
+           (_ccw(ax, ay, bx, by, cx, cy) != _ccw(ax, ay, bx, by, dx, dy))
+
+
+def intersections(segments, lines):
+    """Vectorized Line.intersection() for pairs that do intersect. Returns
+    the arrays of x and y coordinates."""
+    a = -(segments[..., 1] - segments[..., 3])
+    b = segments[..., 0] - segments[..., 2]
+    c = -(lines[..., 1] - lines[..., 3])
+    d = lines[..., 0] - lines[..., 2]
+
+    e = a * segments[..., 0] + b * segments[..., 1]
+    f = c * lines[..., 0] + d * lines[..., 1]
+
+    det = a * d - b * c
+
+    return (d * e - b * f) / det, (a * f - c * e) / det
+
+
+def signs(under, over):
+    """Vectorized Crossing.get_orientation()."""
+    x1 = over[..., 0] - over[..., 2]
+    y1 = over[..., 1] - over[..., 3]
+    x2 = under[..., 0] - under[..., 2]
+    y2 = under[..., 1] - under[..., 3]
+
+    return numpy.sign(x2 * y1 - x1 * y2).astype(int)
+
+
+def segments_of(vertices):
+    points = numpy.array([(v.x, v.y) for v in vertices], dtype=float).reshape(-1, 2)
+
+    return numpy.hstack((points[:-1], points[1:]))
+
+
+def diagram_crossings(vertices, over=None):
+    """Crossings obtained by appending ``vertices`` one at a time.
+
+    Returns ``(under, over, crosspoint, sign)`` tuples, with the segments
+    given by their index and in the order KnotModel.append_vertex() would
+    create them, as expected by KnotModel._restore(). Every segment is
+    tested against all the previous ones, a block of segments at a time."""
+    _require_numpy()
+
+    if len(vertices) < 4:
+        return []
+
+    segments = segments_of(vertices)
+    n = len(segments)
+
+    if over is None:
+        over_flags = numpy.ones(n, dtype=bool)
+    else:
+        over_flags = numpy.array(over[1:], dtype=bool)
+
+    rows = []
+    columns = []
+    block = max(1, _BLOCK // n)
+
+    for start in xrange(2, n, block):
+        end = min(n, start + block)
+        ghosts = numpy.arange(start, end)
+
+        # the segment right before a new one shares a vertex with it
+        hits = intersects(segments[numpy.newaxis, :end - 2], segments[start:end, numpy.newaxis])
+        hits &= numpy.arange(end - 2)[numpy.newaxis, :] < (ghosts - 1)[:, numpy.newaxis]
+
+        j, i = numpy.nonzero(hits)
+        rows.append(j + start)
+        columns.append(i)
+
+    ghost = numpy.concatenate(rows)
+    other = numpy.concatenate(columns)
+
+    xs, ys = intersections(segments[other], segments[ghost])
+    crossing_signs = signs(segments[other], segments[ghost])
+
+    # same filter as KnotModel.append_vertex()
+    origin = segments[0]
+    keep = numpy.sqrt((xs - origin[0]) ** 2 + (ys - origin[1]) ** 2) > 3
+
+    ghost_over = over_flags[ghost]
+    under_index = numpy.where(ghost_over, other, ghost)
+    over_index = numpy.where(ghost_over, ghost, other)
+    crossing_signs = numpy.where(ghost_over, crossing_signs, -crossing_signs)
+
+    return [(int(u), int(o), Point(float(x), float(y)), int(s))
+            for u, o, x, y, s, k in zip(under_index, over_index, xs, ys, crossing_signs, keep)
+            if k]
+
+
+class SegmentArray(object):
+    """Segment index for KnotModel backed by a NumPy array.
+
+    It has the interface of core.SegmentGrid, but candidates() tests the
+    line against every stored segment in a single vectorized computation
+    and only returns the ones it actually crosses."""
+
+    def __init__(self, capacity=64):
+        _require_numpy()
+
+        self._data = numpy.empty((capacity, 4))
+        self._size = 0
+
+    def clear(self):
+        self._size = 0
+
+    def append(self, line):
+        if self._size == len(self._data):
+            self._data = numpy.resize(self._data, (2 * len(self._data), 4))
+
+        self._data[self._size] = (line.orig.x, line.orig.y, line.dest.x, line.dest.y)
+        self._size = self._size + 1
+
+    def pop(self):
+        self._size = self._size - 1
+
+    def __len__(self):
+        return self._size
+
+    def candidates(self, line):
+        row = numpy.array((line.orig.x, line.orig.y, line.dest.x, line.dest.y), dtype=float)
+
+        return numpy.flatnonzero(intersects(self._data[:self._size], row)).tolist()
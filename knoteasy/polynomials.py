@@ -0,0 +1,433 @@
+# encoding: utf-8
+"""Polynomial invariants of knot diagrams.
+
+Laurent polynomials are dicts mapping exponents to (non-zero) integer
+coefficients.
+
+The Kauffman bracket is computed with a dynamic programming sweep over the
+crossings instead of the 2^C state sum. Cutting the diagram between the
+crossings already processed and the rest leaves a set of open edges, and
+all that matters about the smoothings made so far is how they pair up those
+edges: the table maps every such pairing to the partial bracket of the
+states producing it. Its size depends on the number of open edges, not on
+the number of crossings, so crossings are taken in an order that keeps
+that frontier small."""
+
+
+def _add(p, q, factor=1):
+    for e, c in q.iteritems():
+        c = p.get(e, 0) + factor * c
+
+        if c:
+            p[e] = c
+        elif e in p:
+            del p[e]
+
+    return p
+
+
+def _mul(p, q):
+    r = {}
+
+    for e1, c1 in p.iteritems():
+        for e2, c2 in q.iteritems():
+            r[e1 + e2] = r.get(e1 + e2, 0) + c1 * c2
+
+    return dict((e, c) for e, c in r.iteritems() if c)
+
+
+# with markup=True exponents are written as pango <sup> markup
+def format_laurent(p, variable='t', markup=False):
+    if not p:
+        return '0'
+
+    terms = []
+
+    for e in sorted(p, reverse=True):
+        c = p[e]
+        sign = '-' if c < 0 else '+'
+
+        if e == 0:
+            term = '%d' % abs(c)
+        else:
+            term = variable if e == 1 else (('%s<sup>%d</sup>' if markup else '%s^%d') % (variable, e))
+            if abs(c) != 1:
+                term = '%d%s' % (abs(c), term)
+
+        terms.append((sign, term))
+
+    text = ('-' if terms[0][0] == '-' else '') + terms[0][1]
+
+    for sign, term in terms[1:]:
+        text = text + ' %s %s' % (sign, term)
+
+    return text
+
+
+# the loop value d = -A^2 - A^-2
+_LOOP = {2: -1, -2: -1}
+
+
+def _crossing_ends(crossings_trail):
+    """Returns, for every crossing, its four edges (under incoming, under
+    leaving, over incoming, over leaving) and its sign. Edge k goes from the
+    k-th to the (k+1)-th passage through a crossing along the trail."""
+    n = len(crossings_trail)
+    passages = {}
+
+    for k, (c, over) in enumerate(crossings_trail):
+        passages.setdefault(c, [None, None])[1 if over else 0] = k
+
+    ends = []
+    seen = set()
+
+    for c, over in crossings_trail:
+        if c not in seen:
+            seen.add(c)
+            u, o = passages[c]
+            ends.append(((u - 1) % n, u, (o - 1) % n, o, c.sign()))
+
+    return ends
+
+
+def _sweep_order(ends):
+    """Greedily picks the next crossing so that it closes as many open edges
+    and opens as few new ones as possible; ties keep the trail order."""
+    done = [False] * len(ends)
+    open_edges = set()
+    order = []
+
+    for step in xrange(len(ends)):
+        best = None
+
+        for i, crossing in enumerate(ends):
+            if done[i]:
+                continue
+
+            score = 0
+            for e in set(crossing[:4]):
+                if e in open_edges:
+                    score = score + 1
+                elif crossing[:4].count(e) == 1:
+                    score = score - 1
+
+            if best is None or score > best[0]:
+                best = (score, i)
+
+        i = best[1]
+        done[i] = True
+        order.append(i)
+
+        for e in set(ends[i][:4]):
+            if e in open_edges:
+                open_edges.remove(e)
+            elif ends[i][:4].count(e) == 1:
+                open_edges.add(e)
+
+    return order
+
+
+def _smooth(pairing, arcs):
+    """Adds the two arcs of a smoothing to the pairing of the open edges.
+
+    Returns the new pairing and the number of loops closed."""
+    partner = dict(pairing)
+    for a, b in pairing:
+        partner[b] = a
+
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            x = parent[x]
+        return x
+
+    degree = {}
+
+    def link(a, b):
+        degree[a] = degree.get(a, 0) + 1
+        degree[b] = degree.get(b, 0) + 1
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+
+    touched = set()
+
+    for a, b in arcs:
+        link(a, b)
+        touched.add(a)
+        touched.add(b)
+
+    for a in list(touched):
+        if a in partner:
+            b = partner[a]
+
+            # each old pair is linked once
+            if b not in touched or a < b:
+                link(a, b)
+
+    components = {}
+
+    for x in degree:
+        components.setdefault(find(x), []).append(x)
+
+    new_pairs = []
+    loops = 0
+
+    for nodes in components.itervalues():
+        endpoints = [x for x in nodes if degree[x] == 1]
+
+        if endpoints:
+            a, b = endpoints
+            new_pairs.append((min(a, b), max(a, b)))
+        else:
+            loops = loops + 1
+
+    kept = [(a, b) for a, b in pairing if a not in degree and b not in degree]
+
+    return tuple(sorted(kept + new_pairs)), loops
+
+
+def kauffman_bracket(crossings_trail):
+    """Kauffman bracket <D> (a polynomial in A, with <O> = 1) of the diagram
+    given by KnotModel.get_crossings_trail()."""
+    if not crossings_trail:
+        return {0: 1}
+
+    ends = _crossing_ends(crossings_trail)
+    loop_powers = [{0: 1}]
+
+    table = {(): {0: 1}}
+
+    for i in _sweep_order(ends):
+        u_in, u_out, o_in, o_out, sign = ends[i]
+
+        # with the signs of Crossing.get_orientation() (screen coordinates)
+        # the A-smoothing of a positive crossing is the oriented one
+        oriented = ((u_in, o_out), (o_in, u_out))
+        unoriented = ((u_in, o_in), (u_out, o_out))
+
+        if sign > 0:
+            smoothings = ((1, oriented), (-1, unoriented))
+        else:
+            smoothings = ((1, unoriented), (-1, oriented))
+
+        new_table = {}
+
+        for pairing, p in table.iteritems():
+            for shift, arcs in smoothings:
+                new_pairing, loops = _smooth(pairing, arcs)
+
+                while len(loop_powers) <= loops:
+                    loop_powers.append(_mul(loop_powers[-1], _LOOP))
+
+                term = _mul(dict((e + shift, c) for e, c in p.iteritems()), loop_powers[loops])
+                _add(new_table.setdefault(new_pairing, {}), term)
+
+        table = new_table
+
+    bracket = table.get((), {})
+
+    # every state was counted with one loop too many: divide by d
+    return _divide_by_loop(bracket)
+
+
+def _divide_by_loop(p):
+    p = dict(p)
+    q = {}
+
+    # d = -A^-2 (1 + A^4)
+    while p:
+        e = min(p)
+        c = p[e]
+        q[e + 2] = -c
+        _add(p, {e: c, e + 4: c}, -1)
+
+    return dict((e, c) for e, c in q.iteritems() if c)
+
+
+def jones_from_bracket(bracket, writhe):
+    """Jones polynomial, as a Laurent polynomial in t, from the bracket and
+    the writhe of the diagram: V(t) = (-A^3)^-w <D> with A = t^(-1/4)."""
+    f = dict((e - 3 * writhe, -c if writhe % 2 else c) for e, c in bracket.iteritems())
+
+    return dict((-e // 4, c) for e, c in f.iteritems())
+
+
+# Polynomials in Z[t] used by the Alexander polynomial code are lists of
+# coefficients, lowest degree first, without trailing zeros ([] is zero)
+def _trim(p):
+    while p and not p[-1]:
+        p.pop()
+
+    return p
+
+
+def _poly_sub(p, q):
+    r = list(p) + [0] * (len(q) - len(p))
+
+    for i, c in enumerate(q):
+        r[i] = r[i] - c
+
+    return _trim(r)
+
+
+def _poly_mul(p, q):
+    if not p or not q:
+        return []
+
+    r = [0] * (len(p) + len(q) - 1)
+
+    for i, a in enumerate(p):
+        if a:
+            for j, b in enumerate(q):
+                r[i + j] = r[i + j] + a * b
+
+    return r
+
+
+def _poly_div(p, q):
+    """Exact division in Z[t]."""
+    p = list(p)
+    r = [0] * max(len(p) - len(q) + 1, 0)
+
+    for i in xrange(len(p) - len(q), -1, -1):
+        c, remainder = divmod(p[i + len(q) - 1], q[-1])
+
+        if remainder:
+            raise ArithmeticError('inexact polynomial division')
+
+        r[i] = c
+        if c:
+            for j, b in enumerate(q):
+                p[i + j] = p[i + j] - c * b
+
+    if any(p):
+        raise ArithmeticError('inexact polynomial division')
+
+    return _trim(r)
+
+
+def _int_div(a, b):
+    q, remainder = divmod(a, b)
+
+    if remainder:
+        raise ArithmeticError('inexact division')
+
+    return q
+
+
+def _bareiss(matrix, mul, sub, div, one):
+    """Determinant, up to sign, with fraction-free Gaussian elimination: every
+    division is exact, so entries stay in the ring and their size is bounded
+    by the size of the minors of the matrix."""
+    matrix = [list(row) for row in matrix]
+    n = len(matrix)
+    previous = one
+
+    for k in xrange(n - 1):
+        if not matrix[k][k]:
+            for i in xrange(k + 1, n):
+                if matrix[i][k]:
+                    matrix[k], matrix[i] = matrix[i], matrix[k]
+                    break
+            else:
+                return matrix[k][k]
+
+        pivot = matrix[k][k]
+
+        for i in xrange(k + 1, n):
+            for j in xrange(k + 1, n):
+                matrix[i][j] = div(sub(mul(matrix[i][j], pivot),
+                                       mul(matrix[i][k], matrix[k][j])), previous)
+
+        previous = pivot
+
+    return matrix[n - 1][n - 1] if n else one
+
+
+def alexander_matrix(presentation):
+    """Fox derivatives of the relators of a Wirtinger presentation (as given
+    by KnotModel.wirtinger_presentation()) under the abelianization x_i -> t.
+
+    Each row is multiplied by the power of t that makes it a polynomial,
+    which only changes the minors by a unit."""
+    generators = presentation['generators']
+    column = dict((g, j) for j, g in enumerate(generators))
+    matrix = []
+
+    for relation in presentation['relations']:
+        # the relator is word * x_a^-1 for the relation x_a = word
+        word = [(abs(k), 1 if k > 0 else -1) for k in relation[1:]] + [(relation[0], -1)]
+        row = [{} for g in generators]
+        exponent = 0
+
+        for g, e in word:
+            # d(x)/dx = 1 and d(x^-1)/dx = -x^-1, times the prefix
+            if e > 0:
+                _add(row[column[g]], {exponent: 1})
+            else:
+                _add(row[column[g]], {exponent - 1: -1})
+
+            exponent = exponent + e
+
+        low = min([min(p) for p in row if p] or [0])
+        matrix.append([_trim([p.get(e, 0) for e in xrange(low, max(p) + 1)]) if p else []
+                       for p in row])
+
+    return matrix
+
+
+def _alexander_minor(presentation):
+    matrix = alexander_matrix(presentation)
+
+    # any (n-1)x(n-1) minor will do for a knot
+    return [row[:-1] for row in matrix[:-1]]
+
+
+def alexander_polynomial(presentation):
+    """Alexander polynomial from a Wirtinger presentation, as a Laurent
+    polynomial in t normalized so that p(t) = p(1/t) and p(1) = 1."""
+    minor = _alexander_minor(presentation)
+    p = _bareiss(minor, _poly_mul, _poly_sub, _poly_div, [1])
+
+    if not p:
+        return {}
+
+    low = 0
+    while not p[low]:
+        low = low + 1
+
+    p = p[low:]
+    if sum(p) < 0:
+        p = [-c for c in p]
+
+    shift = (len(p) - 1) // 2
+
+    return dict((e - shift, c) for e, c in enumerate(p) if c)
+
+
+def alexander_value(presentation, t):
+    """Quick integer evaluation of the Alexander polynomial at ``t``.
+
+    Works with integers only (no polynomial arithmetic). The polynomial is
+    only defined up to a unit +-t^k, so the absolute value is returned with
+    every factor of t removed; for t = -1 this is the determinant of the
+    knot. Diagrams giving different values are different knots."""
+    minor = [[_evaluate(p, t) for p in row] for row in _alexander_minor(presentation)]
+    value = abs(_bareiss(minor, lambda a, b: a * b, lambda a, b: a - b, _int_div, 1))
+
+    if abs(t) > 1:
+        while value and value % t == 0:
+            value = value // abs(t)
+
+    return value
+
+
+def _evaluate(p, t):
+    value = 0
+
+    for c in reversed(p):
+        value = value * t + c
+
+    return value
@@ -0,0 +1,157 @@
+# encoding: utf-8
+"""Simplification of group presentations with Tietze transformations.
+
+Words are sequences of generator numbers, negative for inverses, and
+relators are words equal to 1. Words are kept in integer arrays, always
+freely and cyclically reduced.
+
+A generator that appears once in a relator is eliminated: it is equal to
+a word in the other generators, which replaces it everywhere, and the
+relator is dropped. Every step eliminates the generator that makes the
+total length of the relators grow the least, until no generator appears
+once in any relator or the relators would get too long.
+
+In a Wirtinger presentation any relation follows from the others, so one
+of them is dropped before starting. The groups of small knots usually end
+up with two or three generators."""
+import array
+
+
+def _reduce(word):
+    """Freely and cyclically reduced copy of ``word``."""
+    reduced = array.array('i')
+
+    for g in word:
+        if reduced and reduced[-1] == -g:
+            reduced.pop()
+        else:
+            reduced.append(g)
+
+    i, j = 0, len(reduced)
+
+    while j - i > 1 and reduced[i] == -reduced[j - 1]:
+        i, j = i + 1, j - 1
+
+    return reduced[i:j]
+
+
+def _inverse(word):
+    return array.array('i', [-g for g in reversed(word)])
+
+
+def _counts(word):
+    counts = {}
+
+    for g in word:
+        counts[abs(g)] = counts.get(abs(g), 0) + 1
+
+    return counts
+
+
+def simplify(generators, relators, max_length=None):
+    """Returns the generators left and the new relators (lists) of the
+    presentation with these generators and relators.
+
+    Generators are not eliminated if the total length of the relators
+    would go over ``max_length``."""
+    generators = list(generators)
+    relators = [_reduce(r) for r in relators]
+    relators = [r for r in relators if r]
+    counts = [_counts(r) for r in relators]
+
+    # occurrences of every generator in all the relators
+    totals = dict((g, 0) for g in generators)
+
+    for c in counts:
+        for g, n in c.iteritems():
+            totals[g] = totals[g] + n
+
+    length = sum(len(r) for r in relators)
+
+    while True:
+        best = None
+
+        for i, r in enumerate(relators):
+            for g, n in counts[i].iteritems():
+                if n == 1:
+                    growth = (totals[g] - 1) * (len(r) - 2) - len(r)
+
+                    if max_length is not None and length + growth > max_length:
+                        continue
+
+                    if best is None or (growth, len(r)) < best[:2]:
+                        best = (growth, len(r), i, g)
+
+        if best is None:
+            break
+
+        i, g = best[2:]
+        r = relators.pop(i)
+
+        for h, n in counts.pop(i).iteritems():
+            totals[h] = totals[h] - n
+
+        # r is (a rotation of) g^e w, so g = w^-e
+        k = [abs(h) for h in r].index(g)
+        rest = r[k + 1:] + r[:k]
+        value = _inverse(rest) if r[k] > 0 else rest
+        inverse = _inverse(value)
+
+        for j, s in enumerate(relators):
+            if g not in counts[j]:
+                continue
+
+            substituted = array.array('i')
+
+            for h in s:
+                if h == g:
+                    substituted.extend(value)
+                elif h == -g:
+                    substituted.extend(inverse)
+                else:
+                    substituted.append(h)
+
+            for h, n in counts[j].iteritems():
+                totals[h] = totals[h] - n
+
+            relators[j] = _reduce(substituted)
+            counts[j] = _counts(relators[j])
+
+            for h, n in counts[j].iteritems():
+                totals[h] = totals[h] + n
+
+        generators.remove(g)
+        del totals[g]
+        length = sum(len(s) for s in relators)
+
+        # relators reduced to 1 say nothing
+        kept = [j for j, s in enumerate(relators) if s]
+        relators = [relators[j] for j in kept]
+        counts = [counts[j] for j in kept]
+
+    unique = []
+    seen = set()
+
+    for r in relators:
+        if tuple(r) not in seen:
+            seen.add(tuple(r))
+            unique.append(r.tolist())
+
+    return generators, unique
+
+
+def simplify_wirtinger(presentation, max_length=None):
+    """Simplified form of a Wirtinger presentation (as returned by
+    KnotModel.wirtinger_presentation()): a dict with its 'generators' and
+    'relators'. By default the relators can't get longer (in total) than
+    four times the original ones."""
+    # the relation x_a = w is the relator w x_a^-1
+    relators = [list(relation[1:]) + [-relation[0]] for relation in presentation['relations']]
+
+    if max_length is None:
+        max_length = 4 * sum(len(r) for r in relators)
+
+    generators, relators = simplify(presentation['generators'], relators[:-1], max_length)
+
+    return {'generators': generators,
+            'relators': relators}
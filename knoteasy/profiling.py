@@ -0,0 +1,114 @@
+# encoding: utf-8
+"""Instrumentation of the hot paths of KnotModel.
+
+Instrumented methods report to the profiler of their model (by default the
+module-wide ``profiler``, disabled). When it is enabled every call records
+its wall time and the size of the model it ran on: number of segments,
+crossings and, once they are known, arcs. Cached results are not counted:
+only the calls that actually compute something are.
+
+Times are kept both cumulative (including the instrumented methods called
+from it) and exclusive, so a profile can be written in the format of the
+standard profile module and read with pstats::
+
+    python -m pstats knoteasy.prof"""
+import marshal
+import threading
+import time
+
+
+class Profiler(object):
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def _frames(self):
+        try:
+            return self._local.frames
+        except AttributeError:
+            self._local.frames = []
+            self._local.active = {}
+            return self._local.frames
+
+    def start(self, key):
+        """Starts timing a call of the function identified by ``key``, a
+        (filename, line, name) tuple. Must be followed by stop()."""
+        frames = self._frames()
+        active = self._local.active
+        active[key] = active.get(key, 0) + 1
+
+        # [key, start time, time spent in instrumented callees]
+        frames.append([key, time.time(), 0.0])
+
+    def stop(self, segments=None, crossings=None, arcs=None):
+        now = time.time()
+        frames = self._frames()
+        active = self._local.active
+        key, start, callees = frames.pop()
+        elapsed = now - start
+        active[key] = active[key] - 1
+
+        if frames:
+            frames[-1][2] = frames[-1][2] + elapsed
+
+        with self._lock:
+            stats = self._stats.get(key)
+
+            if stats is None:
+                stats = self._stats[key] = {'name': key[2],
+                                            'calls': 0,
+                                            'primitive_calls': 0,
+                                            'time': 0.0,
+                                            'own_time': 0.0,
+                                            'segments': 0,
+                                            'crossings': 0,
+                                            'arcs': 0}
+
+            stats['calls'] = stats['calls'] + 1
+            stats['own_time'] = stats['own_time'] + elapsed - callees
+
+            # recursive calls are already part of the outermost one
+            if not active[key]:
+                stats['primitive_calls'] = stats['primitive_calls'] + 1
+                stats['time'] = stats['time'] + elapsed
+
+            # largest input seen
+            for name, size in (('segments', segments), ('crossings', crossings), ('arcs', arcs)):
+                if size is not None and size > stats[name]:
+                    stats[name] = size
+
+    def get_stats(self):
+        """Returns a list with a dict per instrumented function (name, calls,
+        primitive_calls, time, own_time, segments, crossings, arcs), the
+        slowest ones first. Times are in seconds."""
+        with self._lock:
+            stats = [dict(s) for s in self._stats.itervalues()]
+
+        stats.sort(key=lambda s: s['time'], reverse=True)
+
+        return stats
+
+    def dump_stats(self, path):
+        """Writes the data in the format of profile.Profile.dump_stats()."""
+        with self._lock:
+            data = dict((key, (s['primitive_calls'], s['calls'], s['own_time'], s['time'], {}))
+                        for key, s in self._stats.iteritems())
+
+        with open(path, 'wb') as f:
+            marshal.dump(data, f)
+
+
+profiler = Profiler()
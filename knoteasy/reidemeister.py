@@ -0,0 +1,289 @@
+# encoding: utf-8
+"""Simplification of diagrams with Reidemeister moves.
+
+Only the combinatorial data of a diagram is used: the crossings trail
+(passages through crossings along the knot, as in
+KnotModel.get_crossings_trail()) and the crossing signs. Edge k of the
+diagram goes from passage k to passage k + 1. The signs give the cyclic
+order of the four edge ends around every crossing, and with it the faces
+of the diagram (on the sphere, where there are C + 2 of them).
+
+Every pass finds the faces in linear time and removes:
+
+- monogons (Reidemeister I), and
+- bigons whose strands go over at both crossings on one side and under
+  at both on the other (Reidemeister II),
+
+as long as the moves don't share crossings. When no such move is left, a
+Reidemeister III move (a triangular face with one strand over the other
+two) is made only if it leads to a new reduction.
+
+simplify() returns a ReducedKnotModel, a KnotModel without geometry which
+is equivalent to the original one and can compute all the combinatorial
+invariants (Gauss and Dowker codes, Wirtinger presentation, colorings,
+polynomials)."""
+from knoteasy.core import KnotModel, Trail
+
+
+class AbstractCrossing(object):
+    """A crossing of a ReducedKnotModel: it only has a sign."""
+
+    __slots__ = ('index', '_sign')
+
+    def __init__(self, index, sign):
+        self.index = index
+        self._sign = sign
+
+    def sign(self):
+        return self._sign
+
+    def get_orientation(self):
+        return self._sign
+
+    def __repr__(self):
+        return '{%s#%d}' % ('+' if self._sign == 1 else '-', self.index)
+
+
+class AbstractArc(object):
+
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return '[arc #%d]' % self.index
+
+
+class _Diagram(object):
+    """Faces of the diagram given by a trail of (crossing, over) passages,
+    crossings being numbered from 0, and the crossing signs.
+
+    Edge ends are numbered 2k (edge k leaving passage k) and 2k + 1 (edge k
+    arriving at passage k + 1), so the other end of end x is x ^ 1."""
+
+    def __init__(self, trail, signs):
+        self.trail = list(trail)
+        self.signs = signs
+
+        self.passages = [[None, None] for s in signs]
+        for k, (c, over) in enumerate(trail):
+            self.passages[c][1 if over else 0] = k
+
+        self.rotation = [None] * (2 * len(trail))
+        for c in xrange(len(signs)):
+            self._rotate(c)
+
+        self._faces = None
+
+    # counterclockwise order of the ends around a crossing
+    def _rotate(self, c):
+        n = len(self.trail)
+        u, o = self.passages[c]
+        ends = [2 * u, 2 * o, 2 * ((u - 1) % n) + 1, 2 * ((o - 1) % n) + 1]
+
+        if self.signs[c] < 0:
+            ends = [ends[0], ends[3], ends[2], ends[1]]
+
+        for i in xrange(4):
+            self.rotation[ends[i]] = ends[(i + 1) % 4]
+
+    @property
+    def faces(self):
+        if self._faces is None:
+            self._faces = []
+            visited = [False] * len(self.rotation)
+
+            for start in xrange(len(self.rotation)):
+                face = []
+                x = start
+
+                while not visited[x]:
+                    visited[x] = True
+                    face.append(x)
+                    x = self.rotation[x ^ 1]
+
+                if face:
+                    self._faces.append(face)
+
+        return self._faces
+
+    def is_planar(self):
+        return not self.trail or len(self.faces) == len(self.signs) + 2
+
+    def crossing_of(self, end):
+        n = len(self.trail)
+        return self.trail[(end // 2 + end % 2) % n][0]
+
+    # the strand along edge k is over (or under) at both of its ends
+    def _same_level(self, k):
+        n = len(self.trail)
+        return self.trail[k][1] == self.trail[(k + 1) % n][1]
+
+    def reductions(self):
+        """Disjoint sets of crossings removable by Reidemeister I and II."""
+        moves = []
+        used = set()
+        n = len(self.trail)
+
+        for c, (u, o) in enumerate(self.passages):
+            if (u - o) % n in (1, n - 1):
+                moves.append((c,))
+                used.add(c)
+
+        for face in self.faces:
+            if len(face) != 2:
+                continue
+
+            a, b = [self.crossing_of(x) for x in face]
+
+            if a != b and a not in used and b not in used and \
+               self._same_level(face[0] // 2):
+                moves.append((a, b))
+                used.update((a, b))
+
+        return moves
+
+    def has_reduction_at(self, crossings):
+        """Whether a Reidemeister I or II move involving any of the given
+        crossings can be made. Only the faces around them are looked at."""
+        n = len(self.trail)
+
+        for c in crossings:
+            u, o = self.passages[c]
+
+            if (u - o) % n in (1, n - 1):
+                return True
+
+            for x in (2 * u, 2 * o, 2 * ((u - 1) % n) + 1, 2 * ((o - 1) % n) + 1):
+                y = self.rotation[x ^ 1]
+
+                if self.rotation[y ^ 1] == x and self.crossing_of(y) != c and \
+                   self._same_level(x // 2):
+                    return True
+
+        return False
+
+    def slide(self, edges):
+        """Makes the Reidemeister III move over the triangle with the given
+        edges and returns the crossings of the triangle, the only ones
+        updated. Sliding the edges in reverse order undoes the move."""
+        n = len(self.trail)
+        trail = self.trail
+        positions = set(edges) | set((k + 1) % n for k in edges)
+        crossings = set(trail[k][0] for k in positions)
+
+        # the strand along each edge of the triangle passes its two
+        # crossings in the opposite order after the move
+        for k in edges:
+            trail[k], trail[(k + 1) % n] = trail[(k + 1) % n], trail[k]
+
+        for k in positions:
+            c, over = trail[k]
+            self.passages[c][1 if over else 0] = k
+
+        for c in crossings:
+            self._rotate(c)
+
+        self._faces = None
+
+        return crossings
+
+    def triangles(self):
+        """Edges of the triangular faces where a Reidemeister III move can
+        be made: one of the three strands is over the other two."""
+        for face in self.faces:
+            if len(face) != 3:
+                continue
+
+            if len(set(self.crossing_of(x) for x in face)) != 3:
+                continue
+
+            edges = [x // 2 for x in face]
+
+            if any(self._same_level(k) and self.trail[k][1] for k in edges):
+                yield edges
+
+
+def _remove(trail, signs, crossings):
+    crossings = set(crossings)
+    kept = [c for c in xrange(len(signs)) if c not in crossings]
+    index = dict((c, i) for i, c in enumerate(kept))
+
+    return ([(index[c], over) for c, over in trail if c not in crossings],
+            [signs[c] for c in kept])
+
+
+def simplify_trail(trail, signs):
+    """Reduces a diagram given by its trail of (crossing, over) passages
+    (crossings numbered from 0) and the crossing signs. Returns the new
+    trail and signs."""
+    diagram = _Diagram(trail, signs)
+
+    if not diagram.is_planar():
+        return trail, signs
+
+    while trail:
+        moves = diagram.reductions()
+
+        if not moves:
+            for edges in diagram.triangles():
+                crossings = diagram.slide(edges)
+
+                if diagram.has_reduction_at(crossings):
+                    trail = diagram.trail
+                    moves = diagram.reductions()
+                    break
+
+                diagram.slide(edges[::-1])
+            else:
+                break
+
+        trail, signs = _remove(trail, signs, [c for move in moves for c in move])
+        diagram = _Diagram(trail, signs)
+
+    return trail, signs
+
+
+class ReducedKnotModel(KnotModel):
+    """Knot diagram given only by its combinatorial data.
+
+    It has no vertices nor segments: the geometric methods of KnotModel
+    (drawing, mirror_image(), make_alternating()...) can't be used."""
+
+    def __init__(self, trail, signs):
+        super(ReducedKnotModel, self).__init__()
+
+        self.crossings = [AbstractCrossing(i + 1, sign) for i, sign in enumerate(signs)]
+        self._crossings_trail = [(self.crossings[c], over) for c, over in trail]
+        self._trail_columns = Trail((c, over, -1) for c, over in self._crossings_trail)
+
+        # arcs go from an undercrossing to the next one
+        self._arcs = [AbstractArc(i + 1) for i in xrange(max(len(self.crossings), 1))]
+
+    def is_done(self):
+        return True
+
+    def get_trail(self):
+        return [(u'c', c, over) for c, over in self._crossings_trail]
+
+    def get_trail_columns(self):
+        return self._trail_columns
+
+    def get_crossings_trail(self):
+        return self._crossings_trail
+
+    def get_arcs(self):
+        return list(self._arcs)
+
+    def simplified(self):
+        return self
+
+
+def simplify(model):
+    """Returns a ReducedKnotModel equivalent to a (finished) KnotModel."""
+    columns = model.get_trail_columns()
+    trail = [(c, bool(over)) for c, over in columns]
+    signs = list(columns.signs)
+
+    return ReducedKnotModel(*simplify_trail(trail, signs))
@@ -1,11 +1,21 @@
 # encoding: utf-8
 import math
 
+import cairo
 import pygtk
 pygtk.require('2.0')
-import gtk, pango
+import gtk
 
 from knoteasy.core import Point, Line, Crossing, KnotModel
+from knoteasy import profiling
+from knoteasy.polynomials import format_laurent
+from knoteasy.worker import Worker
+
+
+def format_word(word):
+    """Markup for a word in the generators x_i (negative for inverses)."""
+    return ''.join(['x<sub>%d</sub>' % k if k > 0 else 'x<sub>%d</sub><sup>-1</sup>' % -k
+                    for k in word])
 
 
 class KnotDrawingArea(gtk.DrawingArea):
@@ -38,6 +48,7 @@ class KnotDrawingArea(gtk.DrawingArea):
         self.height = 0
         self._mode = self.MODE_DRAWING
         self.cursor = None
+        self._surface = None
         
         self.set_model(KnotModel())
         
@@ -49,7 +60,7 @@ class KnotDrawingArea(gtk.DrawingArea):
             self._mode = self.MODE_DONE
         else:
             self._mode = self.MODE_DRAWING
-        self.queue_draw()
+        self._invalidate()
         
     def _append_vertex(self, v, over=True):
         if not self.knot_model.vertices:
@@ -78,13 +89,28 @@ class KnotDrawingArea(gtk.DrawingArea):
     def set_model(self, model):
         self.knot_model = model
         model.connect('model-changed', self._model_changed_cb)
-        self.queue_draw()        
+        self._invalidate()
 
     def get_model(self):
         return self.knot_model
     
-    def _expose_cb(self, widget, event):
-        cc = self.window.cairo_create()
+    # the committed diagram is drawn once into an off-screen surface and
+    # only redrawn when the model changes; exposes just copy it and add the
+    # ghost line
+    def _invalidate(self):
+        self._surface = None
+        self.queue_draw()
+    
+    def _get_surface(self, cc):
+        if self._surface is None or \
+           (self._surface.get_width(), self._surface.get_height()) != (self.width, self.height):
+            self._surface = cc.get_target().create_similar(cairo.CONTENT_COLOR,
+                                                           max(self.width, 1), max(self.height, 1))
+            self._draw_diagram(gtk.gdk.CairoContext(cairo.Context(self._surface)))
+        
+        return self._surface
+    
+    def _draw_diagram(self, cc):
         cc.set_line_width(self.LINE_WIDTH)
         
         cc.save()
@@ -124,19 +150,6 @@ class KnotDrawingArea(gtk.DrawingArea):
             
         cc.restore()
         
-        # Draw dashed line to cursor from last point
-        if self._mode == self.MODE_DRAWING:
-            if self.cursor is not None and self.knot_model.vertices:
-                last_vertex = self.knot_model.vertices[-1]
-
-                cc.save()
-                cc.set_source_color(self.GHOST_LINE_COLOR)
-                cc.set_dash([5.0])
-                cc.move_to(last_vertex.x, last_vertex.y)
-                cc.line_to(self.cursor.x, self.cursor.y)
-                cc.stroke()
-                cc.restore()
-                
         # Draw crossings
         cc.save()
         for c in self.knot_model.crossings:
@@ -160,12 +173,57 @@ class KnotDrawingArea(gtk.DrawingArea):
             cc.stroke()
             
         cc.restore()
+    
+    def _expose_cb(self, widget, event):
+        cc = self.window.cairo_create()
+        
+        # only the exposed area is repainted
+        cc.rectangle(event.area.x, event.area.y, event.area.width, event.area.height)
+        cc.clip()
+        
+        cc.set_source_surface(self._get_surface(cc), 0, 0)
+        cc.paint()
+        
+        # Draw dashed line to cursor from last point
+        if self._mode == self.MODE_DRAWING:
+            if self.cursor is not None and self.knot_model.vertices:
+                last_vertex = self.knot_model.vertices[-1]
+
+                cc.save()
+                cc.set_line_width(self.LINE_WIDTH)
+                cc.set_source_color(self.GHOST_LINE_COLOR)
+                cc.set_dash([5.0])
+                cc.move_to(last_vertex.x, last_vertex.y)
+                cc.line_to(self.cursor.x, self.cursor.y)
+                cc.stroke()
+                cc.restore()
 
         return False
     
+    # bounding box of the ghost line to the cursor, if it is drawn
+    def _ghost_line_area(self):
+        if self._mode != self.MODE_DRAWING or self.cursor is None or not self.knot_model.vertices:
+            return None
+        
+        last_vertex = self.knot_model.vertices[-1]
+        margin = int(math.ceil(self.LINE_WIDTH)) + 1
+        x0 = int(math.floor(min(last_vertex.x, self.cursor.x))) - margin
+        y0 = int(math.floor(min(last_vertex.y, self.cursor.y))) - margin
+        x1 = int(math.ceil(max(last_vertex.x, self.cursor.x))) + margin
+        y1 = int(math.ceil(max(last_vertex.y, self.cursor.y))) + margin
+        
+        return gtk.gdk.Rectangle(x0, y0, x1 - x0, y1 - y0)
+    
     def _motion_notify_cb(self, widget, event):
+        # the old ghost line must be erased and the new one drawn
+        old_area = self._ghost_line_area()
         self.cursor = Point(event.x, event.y)
-        self.queue_draw()
+        new_area = self._ghost_line_area()
+        
+        for area in (old_area, new_area):
+            if area is not None:
+                self.queue_draw_area(area.x, area.y, area.width, area.height)
+        
         return False
     
     def undo(self):
@@ -174,6 +232,13 @@ class KnotDrawingArea(gtk.DrawingArea):
 
 class MainWindow(gtk.Window):
     
+    # notebook pages
+    PAGE_PROPERTIES = 0
+    PAGE_RAW_DATA = 1
+    PAGE_PERFORMANCE = 2
+    
+    RAW_DATA_PAGE_SIZE = 500
+    
     def __init__(self, **kw):
         super(MainWindow, self).__init__(gtk.WINDOW_TOPLEVEL)
         self.set_title('knot (that) easy')
@@ -197,6 +262,48 @@ class MainWindow(gtk.Window):
         ui_builder.get_object('knot_data_output').set_editable(False)
 
         self.knot_data_nb = ui_builder.get_object('knot_data_nb')
+        self.knot_data_nb.connect('switch-page', self._switch_page_cb)
+        self.worker = Worker()
+        self._snapshot = None
+        self._computed_pages = set()
+        self._raw_data = None
+        self._raw_data_page = 0
+        
+        ui_builder.get_object('raw_data_previous_button').connect('clicked', self._raw_data_previous_cb)
+        ui_builder.get_object('raw_data_next_button').connect('clicked', self._raw_data_next_cb)
+        
+        # Wirtinger relations (fixed height rows: only the visible ones are
+        # measured and drawn)
+        self.relations_store = gtk.ListStore(object)
+        relations_treeview = ui_builder.get_object('wirtinger_relations_treeview')
+        relations_treeview.set_model(self.relations_store)
+        
+        column = gtk.TreeViewColumn('Relations')
+        column.set_sizing(gtk.TREE_VIEW_COLUMN_FIXED)
+        cell = gtk.CellRendererText()
+        column.pack_start(cell)
+        column.set_cell_data_func(cell, self._relation_data_func)
+        relations_treeview.append_column(column)
+        
+        # the Wirtinger presentation or the simplified one (see
+        # knoteasy.presentation)
+        self._presentations = {}
+        self._relators_shown = False
+        ui_builder.get_object('wirtinger_simplified_check').connect('toggled', self._simplified_presentation_cb)
+        
+        # Performance tab (only shown while profiling)
+        self.performance_store = gtk.ListStore(str, int, str, str, int, int, int)
+        performance_treeview = ui_builder.get_object('performance_treeview')
+        performance_treeview.set_model(self.performance_store)
+        
+        for i, title in enumerate(('Method', 'Calls', 'Time (ms)', 'Own time (ms)',
+                                   'Segments', 'Crossings', 'Arcs')):
+            column = gtk.TreeViewColumn(title, gtk.CellRendererText(), text=i)
+            column.set_resizable(True)
+            performance_treeview.append_column(column)
+        
+        ui_builder.get_object('performance_reset_button').connect('clicked', self._performance_reset_cb)
+        ui_builder.get_object('performance_export_button').connect('clicked', self._performance_export_cb)
 
         # Actions & Menubar
         accelgroup = gtk.AccelGroup()
@@ -235,6 +342,11 @@ class MainWindow(gtk.Window):
         actiongroup.add_action_with_accel(action, None)
         knoteasy_menu.append(action.create_menu_item())        
         
+        knoteasy_menu.append(gtk.SeparatorMenuItem())
+        action = gtk.ToggleAction('performance', '_Performance data', None, None)
+        action.connect('toggled', self._performance_toggled_cb)
+        actiongroup.add_action(action)
+        knoteasy_menu.append(action.create_menu_item())
         
         knoteasy_menu.append(gtk.SeparatorMenuItem())
         action = gtk.Action('quit', '_Quit', None, gtk.STOCK_QUIT)
@@ -287,76 +399,244 @@ class MainWindow(gtk.Window):
         self.actiongroup.get_action('reverse-orientation').set_sensitive(model.is_done())
         self.actiongroup.get_action('make-alternating').set_sensitive(model.is_done())
                 
+        # results still being computed are for an older diagram
+        self.worker.cancel()
+        self._computed_pages = set()
+        self._raw_data = None
+        self._presentations = {}
+        
         if model.is_done():
-            text_buffer = gtk.TextBuffer()
-            text_buffer.insert_at_cursor('Vertices:\n')
-            text_buffer.insert_at_cursor(repr(model.vertices) + '\n\n')
-            text_buffer.insert_at_cursor('Trail:\n')
-            text_buffer.insert_at_cursor(repr(model.get_trail()) + '\n\n')
-            text_buffer.insert_at_cursor('Crossings arc info:\n')
-            text_buffer.insert_at_cursor(repr(model.get_crossings_arc_info()) + '\n\n')
-            self.ui_builder.get_object('knot_data_output').set_buffer(text_buffer)            
-            
             self.ui_builder.get_object('label_crossings_no').set_label('%d' % len(model.crossings))
-            self.ui_builder.get_object('label_arcs_no').set_label('%d' % len(model.get_arcs()))
-            self.ui_builder.get_object('label_alternating').set_label('Yes' if model.is_alternating() else 'No')
-            self.ui_builder.get_object('label_writhe').set_label('%d' % model.get_writhe())
             
-            gauss_code = model.extended_gauss_code()
-            self.ui_builder.get_object('label_gauss_code').set_label('%s / %s' % (' '.join(map(str, gauss_code[0])),
-                                                                  ' '.join(gauss_code[1])))
-            self.ui_builder.get_object('label_dowker_code').set_label(' '.join(map(str, model.dowker_notation())))
-
-            # Wirtinger            
-            wirtinger = model.wirtinger_presentation()
-            generators_str = ''
+            for name in ('label_arcs_no', 'label_alternating', 'label_writhe', 'label_knot', 'label_gauss_code',
+                         'label_dowker_code', 'label_wirtinger_generators', 'label_tricolorability',
+                         'label_coloring', 'label_jones', 'label_alexander'):
+                self.ui_builder.get_object(name).set_label('...')
             
-            for i in wirtinger['generators']:
-                generators_str = generators_str + 'x<sub>%d</sub> ' % i
-            self.ui_builder.get_object('label_wirtinger_generators').set_label(generators_str)
+            self.relations_store.clear()
+            self._show_raw_data_page(0)
             
-            relations_vbox = self.ui_builder.get_object('wirtinger_relations_vbox')
-            for w in relations_vbox.get_children():
-                relations_vbox.remove(w)
-                
-            if wirtinger['relations']:
-                for r in wirtinger['relations']:
-                    label = gtk.Label()
-                    label.set_size_request(-1, 30)
-                    label.show()
-                    label.set_selectable(True)
-                    label.set_alignment(0, 0)
-                    label.set_ellipsize(pango.ELLIPSIZE_END)
-                    
-                    relation_str = 'x<sub>%d</sub> = ' % r[0]
-                    
-                    for k in r[1:]:
-                        if k > 0:
-                            relation_str = relation_str + 'x<sub>%d</sub>' % k
-                        else:
-                            relation_str = relation_str + 'x<sub>%d</sub><sup>-1</sup>' % abs(k)
-                    
-                    label.set_markup(relation_str)
-                    
-                    relations_vbox.pack_start(label, False, False, 0)
-            else:
-                label = gtk.Label('--')
-                label.show()
-                relations_vbox.pack_start(label, True, False)
+            # the invariants are computed on another thread, on a copy of
+            # the model that won't change while they are, and only for the
+            # tabs that are shown
+            self._snapshot = model.snapshot()
+            self._compute_page(self.knot_data_nb.get_current_page())
+            self.knot_data_nb.set_sensitive(True)
+        else:
+            self._snapshot = None
+            self.knot_data_nb.set_sensitive(False)
+        
+        if profiling.profiler.enabled:
+            self._update_performance()
+    
+    def _switch_page_cb(self, notebook, page, page_num):
+        self._compute_page(page_num)
+    
+    def _compute_page(self, page_num):
+        if self._snapshot is None or page_num in self._computed_pages:
+            return
+        
+        snapshot = self._snapshot
+        
+        if page_num == self.PAGE_PROPERTIES:
+            tasks = [('arcs', lambda: len(snapshot.get_arcs())),
+                     ('alternating', snapshot.is_alternating),
+                     ('writhe', snapshot.get_writhe),
+                     ('gauss', snapshot.extended_gauss_code),
+                     ('dowker', snapshot.dowker_notation),
+                     (self._presentation_view(), self._presentation_task(snapshot)),
+                     ('tricolorability', snapshot.is_tricolorable),
+                     ('jones', snapshot.jones_polynomial),
+                     ('alexander', snapshot.alexander_polynomial),
+                     ('knot', snapshot.identify)]
+        elif page_num == self.PAGE_RAW_DATA:
+            tasks = [('raw', lambda: self._raw_data_sections(snapshot))]
+        else:
+            if page_num == self.PAGE_PERFORMANCE and profiling.profiler.enabled:
+                self._update_performance()
+            return
+        
+        self._computed_pages.add(page_num)
+        self.worker.submit(tasks, self._invariant_ready_cb, self._invariants_done_cb, replace=False)
+    
+    # the raw data is only formatted a page at a time
+    def _raw_data_sections(self, model):
+        arc_info = sorted(model.get_crossings_arc_info().itervalues(), key=lambda info: info['index'])
+        
+        return [('Vertices', model.vertices),
+                ('Trail', model.get_trail()),
+                ('Crossings arc info', arc_info)]
+    
+    def _raw_data_lines(self, start, end):
+        lines = []
+        offset = 0
+        
+        # every section is a title line and a line per item
+        for title, items in self._raw_data:
+            for k in xrange(max(start - offset, 0), min(end - offset, len(items) + 1)):
+                lines.append(title + ':' if k == 0 else repr(items[k - 1]))
+            
+            offset = offset + len(items) + 1
+        
+        return lines
+    
+    def _show_raw_data_page(self, page):
+        text_buffer = gtk.TextBuffer()
+        
+        if self._raw_data is None:
+            pages = 0
+            self.ui_builder.get_object('label_raw_data_page').set_label('--')
+        else:
+            size = sum(len(items) + 1 for title, items in self._raw_data)
+            pages = max((size + self.RAW_DATA_PAGE_SIZE - 1) // self.RAW_DATA_PAGE_SIZE, 1)
+            start = page * self.RAW_DATA_PAGE_SIZE
             
+            text_buffer.insert_at_cursor('\n'.join(self._raw_data_lines(start, start + self.RAW_DATA_PAGE_SIZE)))
+            self.ui_builder.get_object('label_raw_data_page').set_label('Page %d of %d' % (page + 1, pages))
+        
+        self._raw_data_page = page
+        self.ui_builder.get_object('knot_data_output').set_buffer(text_buffer)
+        self.ui_builder.get_object('raw_data_previous_button').set_sensitive(page > 0)
+        self.ui_builder.get_object('raw_data_next_button').set_sensitive(page + 1 < pages)
+    
+    def _raw_data_previous_cb(self, button):
+        self._show_raw_data_page(self._raw_data_page - 1)
+    
+    def _raw_data_next_cb(self, button):
+        self._show_raw_data_page(self._raw_data_page + 1)
+    
+    # relations are only formatted when their row is drawn
+    def _relation_data_func(self, column, cell, model, it):
+        r = model.get_value(it, 0)
+        
+        if self._relators_shown:
+            cell.set_property('markup', format_word(r) + ' = 1')
+        else:
+            cell.set_property('markup', 'x<sub>%d</sub> = %s' % (r[0], format_word(r[1:])))
+    
+    def _presentation_view(self):
+        if self.ui_builder.get_object('wirtinger_simplified_check').get_active():
+            return 'presentation'
+        
+        return 'wirtinger'
+    
+    def _presentation_task(self, snapshot):
+        if self._presentation_view() == 'presentation':
+            return snapshot.simplified_presentation
+        
+        return snapshot.wirtinger_presentation
+    
+    def _simplified_presentation_cb(self, button):
+        name = self._presentation_view()
+        
+        if name in self._presentations:
+            self._show_presentation(name)
+        elif self._snapshot is not None and self.PAGE_PROPERTIES in self._computed_pages:
+            self.ui_builder.get_object('label_wirtinger_generators').set_label('...')
+            self.relations_store.clear()
+            self.worker.submit([(name, self._presentation_task(self._snapshot))],
+                               self._invariant_ready_cb, replace=False)
+    
+    def _show_presentation(self, name):
+        get_object = self.ui_builder.get_object
+        value = self._presentations[name]
+        
+        generators_str = ''
+        
+        for i in value['generators']:
+            generators_str = generators_str + 'x<sub>%d</sub> ' % i
+        get_object('label_wirtinger_generators').set_label(generators_str or '--')
+        
+        # the view is detached while the rows are added
+        relations_treeview = get_object('wirtinger_relations_treeview')
+        relations_treeview.set_model(None)
+        self.relations_store.clear()
+        self._relators_shown = name == 'presentation'
+        
+        for r in value['relators' if self._relators_shown else 'relations']:
+            self.relations_store.append((r,))
+        
+        relations_treeview.set_model(self.relations_store)
+    
+    # called on the main loop as each invariant is ready
+    def _invariant_ready_cb(self, name, value):
+        get_object = self.ui_builder.get_object
+        
+        if name == 'arcs':
+            get_object('label_arcs_no').set_label('%d' % value)
+        elif name == 'alternating':
+            get_object('label_alternating').set_label('Yes' if value else 'No')
+        elif name == 'writhe':
+            get_object('label_writhe').set_label('%d' % value)
+        elif name == 'gauss':
+            get_object('label_gauss_code').set_label('%s / %s' % (' '.join(map(str, value[0])),
+                                                                  ' '.join(value[1])))
+        elif name == 'dowker':
+            get_object('label_dowker_code').set_label(' '.join(map(str, value)))
+        elif name in ('wirtinger', 'presentation'):
+            self._presentations[name] = value
             
-            # 3-colorability
-            is_tricolorable, coloring = model.is_tricolorable()
-            self.ui_builder.get_object('label_tricolorability').set_label('Yes' if is_tricolorable else 'No')
+            if name == self._presentation_view():
+                self._show_presentation(name)
+        elif name == 'tricolorability':
+            is_tricolorable, coloring = value
+            get_object('label_tricolorability').set_label('Yes' if is_tricolorable else 'No')
             
             if is_tricolorable:
-                self.ui_builder.get_object('label_coloring').set_markup(' '.join(['c<sub>%d</sub>' % (x['color'] + 1) for x in coloring]))
+                get_object('label_coloring').set_markup(' '.join(['c<sub>%d</sub>' % (x['color'] + 1) for x in coloring]))
             else:
-                self.ui_builder.get_object('label_coloring').set_label('--')
-            
-            self.knot_data_nb.set_sensitive(True)
+                get_object('label_coloring').set_label('--')
+        elif name == 'jones':
+            get_object('label_jones').set_markup(format_laurent(value, markup=True))
+        elif name == 'alexander':
+            get_object('label_alexander').set_markup(format_laurent(value, markup=True))
+        elif name == 'knot':
+            # names like 5_2 are written with a subscript
+            names = ['%s<sub>%s</sub>' % tuple(n.split('_', 1)) for n in value]
+            get_object('label_knot').set_markup(' or '.join(names) if names else 'Not in the knot table')
+        elif name == 'raw':
+            self._raw_data = value
+            self._show_raw_data_page(0)
+    
+    def _invariants_done_cb(self):
+        if profiling.profiler.enabled:
+            self._update_performance()
+    
+    def _update_performance(self):
+        self.performance_store.clear()
+        
+        for stats in profiling.profiler.get_stats():
+            self.performance_store.append((stats['name'], stats['calls'],
+                                           '%.2f' % (stats['time'] * 1000),
+                                           '%.2f' % (stats['own_time'] * 1000),
+                                           stats['segments'], stats['crossings'], stats['arcs']))
+    
+    def _performance_toggled_cb(self, action):
+        performance_vbox = self.ui_builder.get_object('performance_vbox')
+        
+        if action.get_active():
+            profiling.profiler.enable()
+            performance_vbox.show()
+            self._update_performance()
         else:
-            self.knot_data_nb.set_sensitive(False)
+            profiling.profiler.disable()
+            performance_vbox.hide()
+    
+    def _performance_reset_cb(self, button):
+        profiling.profiler.reset()
+        self._update_performance()
+    
+    def _performance_export_cb(self, button):
+        dialog = gtk.FileChooserDialog('Export profile', self, gtk.FILE_CHOOSER_ACTION_SAVE,
+                                       (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL,
+                                        gtk.STOCK_SAVE, gtk.RESPONSE_ACCEPT))
+        dialog.set_do_overwrite_confirmation(True)
+        dialog.set_current_name('knoteasy.prof')
+        
+        if dialog.run() == gtk.RESPONSE_ACCEPT:
+            profiling.profiler.dump_stats(dialog.get_filename())
+        
+        dialog.destroy()
     
     def about_cb(self, action):
         dialog = gtk.AboutDialog()
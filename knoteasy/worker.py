@@ -0,0 +1,83 @@
+# encoding: utf-8
+"""Computation of invariants off the GTK main loop.
+
+A Worker runs jobs (lists of named functions) one after the other on a
+daemon thread. Results are handed back to the main loop with
+gobject.idle_add(), one at a time as they are computed, so the UI can show
+each of them as soon as it is ready.
+
+Every cancel() (and submit(), unless told otherwise) starts a new
+generation: jobs and results of an older generation are dropped, and a
+running job stops at its next function.
+A function that is already running can't be interrupted, but its result is
+discarded. The functions should only use data nobody else changes (e.g.
+a KnotModel.snapshot())."""
+import Queue
+import sys
+import threading
+import traceback
+
+import gobject
+
+
+class Worker(object):
+
+    def __init__(self):
+        # idle_add() is called from the worker thread
+        gobject.threads_init()
+
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._jobs = Queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def submit(self, tasks, callback, done=None, replace=True):
+        """Queues a new job, cancelling the pending ones unless ``replace``
+        is False.
+
+        ``tasks`` is a list of (name, function) pairs. callback(name, result)
+        is called on the main loop after each function returns, and done(),
+        if given, after the last one."""
+        with self._lock:
+            if replace:
+                self._generation = self._generation + 1
+            generation = self._generation
+
+        self._jobs.put((generation, tasks, callback, done))
+
+    def cancel(self):
+        with self._lock:
+            self._generation = self._generation + 1
+
+    def is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            generation, tasks, callback, done = self._jobs.get()
+
+            for name, function in tasks:
+                if not self.is_current(generation):
+                    break
+
+                try:
+                    result = function()
+                except Exception:
+                    # the other results are still worth showing
+                    traceback.print_exc(file=sys.stderr)
+                    continue
+
+                gobject.idle_add(self._deliver, generation, callback, name, result)
+            else:
+                if done is not None:
+                    gobject.idle_add(self._deliver, generation, done)
+
+    def _deliver(self, generation, callback, *args):
+        if self.is_current(generation):
+            callback(*args)
+
+        # run once
+        return False
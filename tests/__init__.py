@@ -0,0 +1,29 @@
+# encoding: utf-8
+"""Regression tests, with known values of small knots. Run them with::
+
+    python -m unittest discover tests
+
+Diagrams come from benchmarks.generators, so no GTK is needed."""
+from benchmarks.generators import torus_knot, twist_knot
+from knoteasy.core import Point, KnotModel
+
+
+def trefoil():
+    return KnotModel(*torus_knot(2, 3))
+
+
+def figure_eight():
+    return KnotModel(*twist_knot(2))
+
+
+def cinquefoil():
+    return KnotModel(*torus_knot(2, 5))
+
+
+def three_twist():
+    return KnotModel(*twist_knot(3))
+
+
+def kinked_unknot():
+    """A closed curve with a single (removable) crossing."""
+    return KnotModel([Point(0, 0), Point(100, 100), Point(100, 0), Point(0, 100), Point(0, 0)])
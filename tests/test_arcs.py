@@ -0,0 +1,49 @@
+# encoding: utf-8
+import unittest
+
+from knoteasy.core import Point, KnotModel
+from tests import trefoil, figure_eight, kinked_unknot
+
+
+def comb(n):
+    """A zigzag of n segments under a single long line."""
+    points = [Point(10 * i, 100 if i % 2 else -100) for i in xrange(n + 1)]
+
+    return points + [Point(10 * n + 10, 0), Point(-10, 0), points[0]]
+
+
+class ArcsTest(unittest.TestCase):
+
+    def check_arcs(self, model):
+        arcs = model.get_arcs()
+
+        self.assertEqual(len(arcs), max(len(model.crossings), 1))
+        self.assertEqual(len(set(arcs)), len(arcs))
+
+        # every piece of the trail is in the arc given by Trail.arcs
+        trail = model.get_trail_columns()
+
+        for k, piece in enumerate(model._pieces()):
+            segments = set(arcs[trail.arcs[k]].segments)
+            self.assertTrue(all(s in segments for s in piece.segments))
+
+        return arcs
+
+    def test_small_knots(self):
+        for model in (trefoil(), figure_eight(), kinked_unknot()):
+            self.check_arcs(model)
+
+    def test_long_overstrand(self):
+        model = KnotModel(comb(300))
+        arcs = self.check_arcs(model)
+
+        # the long line goes over every crossing, so it is inside one arc
+        overstrand = max(arcs, key=lambda arc: len(arc.segments))
+        self.assertTrue(len(overstrand.segments) > 300)
+
+        for info in model.get_crossings_arc_info().itervalues():
+            self.assertEqual(info['overstrand'], overstrand)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# encoding: utf-8
+import unittest
+
+from knoteasy.coloring import smith_normal_form
+from tests import trefoil, figure_eight, cinquefoil, three_twist, kinked_unknot
+
+
+class SmithNormalFormTest(unittest.TestCase):
+
+    def test_known_matrix(self):
+        matrix = [[2, 4, 4], [-6, 6, 12], [10, -4, -16]]
+        self.assertEqual(smith_normal_form(matrix, 3), [2, 6, 12])
+
+    def test_zero_factors_last(self):
+        self.assertEqual(smith_normal_form([[0, 0], [0, 3]], 2), [3, 0])
+
+
+class FoxColoringsTest(unittest.TestCase):
+
+    def test_determinants(self):
+        for model, determinant in ((trefoil(), 3), (figure_eight(), 5), (cinquefoil(), 5),
+                                   (three_twist(), 7), (kinked_unknot(), 1)):
+            self.assertEqual(model.get_determinant(), determinant)
+
+    def test_colorable_moduli(self):
+        self.assertEqual(trefoil().fox_colorings().colorable_moduli(10), [3, 6, 9])
+        self.assertEqual(figure_eight().fox_colorings().colorable_moduli(10), [5, 10])
+
+    def test_tricolorings(self):
+        for model in (trefoil(), figure_eight(), cinquefoil(), three_twist(), kinked_unknot()):
+            self.assertEqual(model.number_of_tricolorings(),
+                             model.fox_colorings().number_of_colorings(3))
+
+        self.assertEqual(trefoil().number_of_tricolorings(), 9)
+        self.assertTrue(trefoil().is_tricolorable()[0])
+        self.assertFalse(figure_eight().is_tricolorable()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# encoding: utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.generators import random_walk, torus_knot, twist_knot
+from knoteasy.core import Point, KnotModel
+from knoteasy.corpus import Corpus, CorpusError, write_corpus
+
+
+class CorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'corpus.krp')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def models(self):
+        return [KnotModel(*torus_knot(2, 3)), KnotModel(*twist_knot(3)),
+                KnotModel(*random_walk(60, seed=2)), KnotModel([Point(0, 0), Point(10, 10)]),
+                # the segment from (0, 0) to (200, 0) is there twice
+                KnotModel([Point(0, 0), Point(200, 0), Point(100, 150), Point(0, 0), Point(200, 0),
+                           Point(150, -80), Point(60, 120), Point(-20, 60), Point(0, 0)])]
+
+    def test_round_trip(self):
+        models = self.models()
+        KnotModel.write_corpus(self.path, models)
+        corpus = KnotModel.read_corpus(self.path)
+
+        try:
+            self.assertEqual(len(corpus), len(models))
+
+            for model, read in zip(models, corpus):
+                self.assertEqual(read.vertices, model.vertices)
+                self.assertEqual(read.crossings, model.crossings)
+                self.assertEqual(read._crossing_entries(), model._crossing_entries())
+                self.assertEqual(read.extended_gauss_code(), model.extended_gauss_code())
+
+            self.assertEqual(corpus[-1].gauss_code(), models[-1].gauss_code())
+            self.assertEqual(corpus.get_vertices(0), [(v.x, v.y) for v in models[0].vertices])
+            self.assertRaises(IndexError, corpus.__getitem__, len(models))
+        finally:
+            corpus.close()
+
+    def test_without_crossings(self):
+        # the vertices are appended again, every crossing going over
+        models = [KnotModel(*random_walk(40, seed=seed)) for seed in xrange(3)]
+        write_corpus(self.path, models, crossings=False)
+
+        with Corpus(self.path) as corpus:
+            for model, read in zip(models, corpus):
+                self.assertEqual(read.vertices, model.vertices)
+                self.assertEqual(read.gauss_code(), KnotModel(model.vertices).gauss_code())
+
+    def test_not_a_corpus(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a corpus file at all')
+
+        self.assertRaises(CorpusError, Corpus, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# encoding: utf-8
+import math
+import random
+import unittest
+
+from benchmarks.generators import random_walk
+from knoteasy.core import Point, Line, SegmentGrid, KnotModel
+
+
+def star(n=5, radius=100.0):
+    """Closed {n/2} star polygon: n crossings."""
+    points = [Point(200 + radius * math.cos(2 * math.pi * 2 * k / n),
+                    200 + radius * math.sin(2 * math.pi * 2 * k / n)) for k in xrange(n)]
+
+    return points + [points[0]]
+
+
+class SegmentGridTest(unittest.TestCase):
+
+    def check_candidates(self, points):
+        grid = SegmentGrid()
+        lines = []
+
+        for a, b in zip(points, points[1:]):
+            line = Line(a, b)
+            found = set(grid.candidates(line))
+
+            for i, other in enumerate(lines):
+                if other.intersects(line):
+                    self.assertTrue(i in found)
+
+            lines.append(line)
+            grid.append(line)
+
+        return grid
+
+    def test_candidates(self):
+        r = random.Random(1)
+        self.check_candidates([Point(r.uniform(0, 500), r.uniform(0, 500)) for i in xrange(300)])
+
+        # lengths from 0.001 to 1000
+        points = [Point(0, 0)]
+
+        for i in xrange(300):
+            length = 10 ** r.uniform(-3, 3)
+            angle = r.uniform(0, 2 * math.pi)
+            points.append(Point(points[-1].x + length * math.cos(angle),
+                                points[-1].y + length * math.sin(angle)))
+
+        self.check_candidates(points)
+
+    def test_degenerate_segments(self):
+        for first in (Point(0, 0), Point(0.01, 0)):
+            grid = self.check_candidates([Point(0, 0), first, Point(300, 300), Point(300, 0), Point(0, 300)])
+            self.assertTrue(grid.cell_size >= SegmentGrid.MIN_CELL_SIZE)
+            self.assertTrue(len(grid._cells) < 100)
+
+
+class CrossingsTest(unittest.TestCase):
+
+    def check_scan(self, model):
+        # the pairs of segments crossing, testing every pair like the
+        # original append_vertex()
+        segments = model.segments
+        expected = set()
+
+        for j in xrange(len(segments)):
+            for i in xrange(j - 1):
+                if segments[i].intersects(segments[j]) and \
+                   segments[i].intersection(segments[j]).distance(model.vertices[0]) > 3:
+                    expected.add((i, j))
+
+        found = set(tuple(sorted(entry[:2])) for entry in model._crossing_entries())
+        self.assertEqual(found, expected)
+
+    def test_scan(self):
+        for seed in xrange(10):
+            self.check_scan(KnotModel(*random_walk(60, seed=seed)))
+
+        points = star()
+        self.check_scan(KnotModel([points[0]] + points))
+        self.check_scan(KnotModel(points[:3] + [points[2], points[2]] + points[3:]))
+
+    def test_star(self):
+        self.assertEqual(len(KnotModel(star()).crossings), 5)
+        self.assertEqual(len(KnotModel(star(7)).crossings), 7)
+
+    def test_duplicated_vertices(self):
+        points = star()
+        self.assertEqual(len(KnotModel([points[0]] + points).crossings), 5)
+        self.assertEqual(len(KnotModel([Point(0, 0), Point(0, 0), Point(300, 300)]).segments), 2)
+
+
+class SegmentCrossingsTest(unittest.TestCase):
+
+    def check_sorted(self, model):
+        # what get_crossings_involving_line() used to compute, scanning
+        # all the crossings
+        for line in model.segments:
+            involved = [c for c in model.crossings if c.under == line or c.over == line]
+            involved.sort(key=lambda c: c.crosspoint.distance(line.orig))
+
+            self.assertEqual(model.get_crossings_involving_line(line), involved)
+
+    def test_append_and_remove(self):
+        vertices, over = random_walk(60, seed=3)
+        model = KnotModel(vertices, over)
+        self.check_sorted(model)
+
+        for i in xrange(20):
+            model.remove_last_vertex()
+
+        self.check_sorted(model)
+        self.assertEqual(model.get_trail(), KnotModel(vertices[:-20], over[:-20]).get_trail())
+
+        for v, v_over in zip(vertices[-20:], over[-20:]):
+            model.append_vertex(v, v_over)
+
+        self.check_sorted(model)
+        self.assertEqual(model.gauss_code(), KnotModel(vertices, over).gauss_code())
+
+    def test_make_alternating(self):
+        model = KnotModel(*random_walk(60, seed=4))
+        model.make_alternating()
+
+        self.assertTrue(model.is_alternating())
+        self.check_sorted(model)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# encoding: utf-8
+import unittest
+
+from knoteasy import engine
+from knoteasy.core import Point, KnotModel
+
+
+class ReadersTest(unittest.TestCase):
+
+    def test_csv(self):
+        records = list(engine.read_csv(['# id, x0, y0, ...', 'a,0,0,10,10', 'b,0,0,10,10,5', 'c,0,x']))
+
+        self.assertEqual(records[0], {'id': 'a', 'vertices': [(0.0, 0.0), (10.0, 10.0)], 'over': None})
+        self.assertEqual(records[1]['id'], 'b')
+        self.assertTrue('odd number of coordinates' in records[1]['error'])
+        self.assertTrue('error' in records[2])
+
+    def test_jsonl(self):
+        records = list(engine.read_jsonl(['{"id": "a", "vertices": [[0, 0], [1, 1]]}', '[[0, 0]]', '{']))
+
+        self.assertEqual(records[0], {'id': 'a', 'vertices': [[0, 0], [1, 1]], 'over': None})
+        self.assertEqual(records[1]['vertices'], [[0, 0]])
+        self.assertTrue('error' in records[2])
+
+
+class BuildModelTest(unittest.TestCase):
+
+    def test_over_flags(self):
+        vertices = [Point(0, 0), Point(10, 10), Point(10, 0)]
+
+        self.assertRaises(ValueError, KnotModel, vertices, [True])
+        self.assertRaises(ValueError, KnotModel, vertices, [True] * 4)
+
+        record = {'id': 1, 'vertices': [(0, 0), (10, 10), (10, 0)], 'over': [True]}
+        result = list(engine.run([record], ['crossings'], processes=1))
+        self.assertTrue(result[0]['error'].startswith('ValueError'))
+
+    def test_integer_coordinates(self):
+        model = engine.build_model({'vertices': [(0, 0), (10, 10), (10, 0), (0, 10), (0, 0)]})
+        self.assertEqual(len(model.crossings), 1)
+        self.assertEqual(model.crossings[0].crosspoint, Point(5.0, 5.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+# encoding: utf-8
+import unittest
+
+from benchmarks.generators import random_walk, torus_knot, twist_knot, pretzel_knot
+from knoteasy.core import KnotModel
+
+
+class GeneratorsTest(unittest.TestCase):
+
+    def test_random_walks(self):
+        # V(1) = 1 for every knot; crossings dropped near the first vertex
+        # used to break it (seeds 42 and 54)
+        for seed in xrange(60):
+            model = KnotModel(*random_walk(25, seed=seed))
+
+            self.assertEqual(sum(model.jones_polynomial().itervalues()), 1)
+            self.assertNotEqual(model.canonical_dowker_notation(), None)
+
+    def test_named_knots(self):
+        for diagram, name in ((torus_knot(2, 3), '3_1'), (torus_knot(2, 5), '5_1'),
+                              (twist_knot(2), '4_1'), (twist_knot(3), '5_2'),
+                              (pretzel_knot(1, 1, 1), '3_1')):
+            self.assertEqual(KnotModel(*diagram).identify(), [name])
+
+
+if __name__ == '__main__':
+    unittest.main()
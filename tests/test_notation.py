@@ -0,0 +1,60 @@
+# encoding: utf-8
+import unittest
+
+from benchmarks.generators import random_walk, torus_knot
+from knoteasy import notation
+from knoteasy.core import Point, KnotModel
+from tests import trefoil, figure_eight, cinquefoil, three_twist, kinked_unknot
+
+
+def walk(seed):
+    return KnotModel(*random_walk(25, seed=seed))
+
+
+class CanonicalDowkerTest(unittest.TestCase):
+
+    def test_known_codes(self):
+        self.assertEqual(trefoil().canonical_dowker_notation(), (4, 6, 2))
+        self.assertEqual(figure_eight().canonical_dowker_notation(), (4, 6, 8, 2))
+        self.assertEqual(cinquefoil().canonical_dowker_notation(), (6, 8, 10, 2, 4))
+        self.assertEqual(three_twist().canonical_dowker_notation(), (4, 8, 10, 2, 6))
+
+    def test_unknot(self):
+        self.assertEqual(kinked_unknot().canonical_dowker_notation(), (2,))
+        self.assertEqual(kinked_unknot().canonical_dowker_notation(simplify=True), ())
+
+    def test_mirror_and_orientation(self):
+        for model in (trefoil(), figure_eight(), walk(6), walk(16), walk(17)):
+            code = model.canonical_dowker_notation()
+
+            self.assertEqual(model.mirror_image().canonical_dowker_notation(), code)
+            self.assertEqual(model.orientation_reversed().canonical_dowker_notation(), code)
+            self.assertEqual(model.orientation_reversed().canonical_dowker_notation(mirror=False),
+                             model.canonical_dowker_notation(mirror=False))
+
+        # without mirror images a chiral diagram has its own code
+        model = walk(16)
+        self.assertNotEqual(model.mirror_image().canonical_dowker_notation(mirror=False),
+                            model.canonical_dowker_notation(mirror=False))
+
+    def test_translation(self):
+        vertices, over = torus_knot(2, 3)
+        moved = KnotModel([Point(p.x + 37, p.y - 11) for p in vertices], over)
+
+        self.assertEqual(moved.canonical_dowker_notation(), trefoil().canonical_dowker_notation())
+
+    def test_start(self):
+        trail = [(c, bool(over)) for c, over in walk(6).get_trail_columns()]
+        code = notation.canonical_dowker(trail)
+
+        for k in xrange(len(trail)):
+            self.assertEqual(notation.canonical_dowker(trail[k:] + trail[:k]), code)
+            self.assertEqual(notation.canonical_dowker(list(reversed(trail[k:] + trail[:k]))), code)
+
+    def test_non_planar(self):
+        self.assertEqual(notation.canonical_dowker([]), ())
+        self.assertEqual(notation.canonical_dowker([(0, True), (1, False), (0, False), (1, True)]), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# encoding: utf-8
+import unittest
+
+from knoteasy.core import Point, KnotModel
+from tests import trefoil, figure_eight, cinquefoil, three_twist, kinked_unknot
+
+
+class JonesTest(unittest.TestCase):
+
+    def test_known_values(self):
+        # torus_knot(2, n) draws the left-handed torus knots
+        self.assertEqual(trefoil().jones_polynomial(), {-4: -1, -3: 1, -1: 1})
+        self.assertEqual(figure_eight().jones_polynomial(), {-2: 1, -1: -1, 0: 1, 1: -1, 2: 1})
+        self.assertEqual(cinquefoil().jones_polynomial(), {-7: -1, -6: 1, -5: -1, -4: 1, -2: 1})
+
+    def test_unknot(self):
+        self.assertEqual(kinked_unknot().jones_polynomial(), {0: 1})
+
+    def test_mirror_image(self):
+        # V(mirror)(t) = V(1/t)
+        for model in (trefoil(), figure_eight(), three_twist()):
+            mirrored = dict((-e, c) for e, c in model.jones_polynomial().iteritems())
+            self.assertEqual(model.mirror_image().jones_polynomial(), mirrored)
+
+    def test_open_diagram(self):
+        self.assertEqual(KnotModel([Point(0, 0), Point(10, 10), Point(10, 0)]).jones_polynomial(), None)
+
+
+class AlexanderTest(unittest.TestCase):
+
+    def test_known_values(self):
+        self.assertEqual(trefoil().alexander_polynomial(), {-1: 1, 0: -1, 1: 1})
+        self.assertEqual(figure_eight().alexander_polynomial(), {-1: -1, 0: 3, 1: -1})
+        self.assertEqual(three_twist().alexander_polynomial(), {-1: 2, 0: -3, 1: 2})
+
+    def test_unknot(self):
+        self.assertEqual(kinked_unknot().alexander_polynomial(), {0: 1})
+
+    def test_mirror_image(self):
+        for model in (trefoil(), cinquefoil(), three_twist()):
+            self.assertEqual(model.mirror_image().alexander_polynomial(), model.alexander_polynomial())
+
+    def test_value(self):
+        # |p(-1)| is the determinant
+        for model in (trefoil(), figure_eight(), cinquefoil(), three_twist()):
+            self.assertEqual(model.alexander_value(-1), model.get_determinant())
+
+        self.assertEqual(trefoil().alexander_value(2), 3)
+
+    def test_open_diagram(self):
+        self.assertEqual(KnotModel([Point(0, 0), Point(10, 10), Point(10, 0)]).alexander_polynomial(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
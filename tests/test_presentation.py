@@ -0,0 +1,70 @@
+# encoding: utf-8
+import unittest
+
+from benchmarks.generators import random_walk
+from knoteasy import polynomials
+from knoteasy.core import KnotModel
+from knoteasy.presentation import simplify
+from tests import trefoil, figure_eight, cinquefoil, three_twist, kinked_unknot
+
+
+def alexander(presentation):
+    """Alexander polynomial of a simplified presentation of deficiency one,
+    written back as relations x = w for polynomials.alexander_polynomial()."""
+    relations = []
+
+    for relator in presentation['relators']:
+        # a rotation of the relator ending in some x^-1
+        k = max(i for i, g in enumerate(relator) if g < 0)
+        word = relator[k + 1:] + relator[:k + 1]
+        relations.append([-word[-1]] + word[:-1])
+
+    # the last relation is ignored
+    g = presentation['generators'][0]
+    relations.append([g, g])
+
+    return polynomials.alexander_polynomial({'generators': presentation['generators'],
+                                             'relations': relations})
+
+
+class SimplifyTest(unittest.TestCase):
+
+    def test_eliminations(self):
+        self.assertEqual(simplify([1, 2], [[1, -2]]), ([2], []))
+        self.assertEqual(simplify([1, 2, 3], [[1, 2, -3], [3, 1, -3, -2]]), ([2, 3], [[3, 3, -2, -3, -2]]))
+
+    def test_trivial_relators(self):
+        self.assertEqual(simplify([1, 2], [[1, 2, -2, -1]]), ([1, 2], []))
+
+    def test_max_length(self):
+        self.assertEqual(simplify([1, 2, 3], [[1, 2, -3], [3, 1, -3, -2]], 0),
+                         ([1, 2, 3], [[1, 2, -3], [3, 1, -3, -2]]))
+
+
+class WirtingerTest(unittest.TestCase):
+
+    def test_two_bridge_knots(self):
+        for model in (trefoil(), figure_eight(), cinquefoil(), three_twist()):
+            presentation = model.simplified_presentation()
+
+            self.assertEqual(len(presentation['generators']), 2)
+            self.assertEqual(len(presentation['relators']), 1)
+
+        self.assertEqual(len(trefoil().simplified_presentation()['relators'][0]), 6)
+
+    def test_unknot(self):
+        self.assertEqual(kinked_unknot().simplified_presentation(), {'generators': [1], 'relators': []})
+
+    def test_alexander(self):
+        models = [trefoil(), figure_eight(), cinquefoil(), three_twist()]
+        models.extend(KnotModel(*random_walk(25, seed=seed)) for seed in (6, 16, 17))
+
+        for model in models:
+            presentation = model.simplified_presentation()
+
+            self.assertEqual(len(presentation['generators']) - len(presentation['relators']), 1)
+            self.assertEqual(alexander(presentation), model.alexander_polynomial())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# encoding: utf-8
+import unittest
+
+from benchmarks.generators import random_walk
+from knoteasy.core import KnotModel
+from tests import trefoil, figure_eight, three_twist, kinked_unknot
+
+
+def walk(seed):
+    return KnotModel(*random_walk(25, seed=seed))
+
+
+class SimplifyTest(unittest.TestCase):
+
+    def test_invariants(self):
+        for seed in (0, 6, 13, 16, 17):
+            model = walk(seed)
+            reduced = model.simplified()
+
+            self.assertTrue(len(reduced.crossings) <= len(model.crossings))
+            self.assertEqual(reduced.jones_polynomial(), model.jones_polynomial())
+            self.assertEqual(reduced.alexander_polynomial(), model.alexander_polynomial())
+            self.assertEqual(reduced.get_determinant(), model.get_determinant())
+            self.assertEqual(reduced.number_of_tricolorings(), model.number_of_tricolorings())
+
+    def test_reductions(self):
+        self.assertEqual(len(kinked_unknot().simplified().crossings), 0)
+
+        # 9 and 14 crossings, both trefoils
+        self.assertEqual(len(walk(6).simplified().crossings), 3)
+        self.assertEqual(len(walk(17).simplified().crossings), 3)
+
+    def test_reduced_diagrams(self):
+        for model in (trefoil(), figure_eight(), three_twist()):
+            reduced = model.simplified()
+
+            self.assertEqual(len(reduced.crossings), len(model.crossings))
+            self.assertTrue(reduced.simplified() is reduced)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# encoding: utf-8
+import itertools
+import unittest
+
+from benchmarks.generators import random_walk, twist_knot, pretzel_knot
+from knoteasy.core import KnotModel
+from tests import trefoil, figure_eight, cinquefoil, three_twist, kinked_unknot
+
+
+def brute_force(model):
+    """Number of colorings of the arcs with 3 colors, trying all of them."""
+    arcs = model.get_arcs()
+    index = dict((arc, i) for i, arc in enumerate(arcs))
+    strands = [[index[info[s]] for s in ('overstrand', 'understrand-incoming', 'understrand-leaving')]
+               for info in model.get_crossings_arc_info().itervalues()]
+
+    return sum(1 for colors in itertools.product(xrange(3), repeat=len(arcs))
+               if all(sum(colors[i] for i in s) % 3 == 0 for s in strands))
+
+
+class TricolorabilityTest(unittest.TestCase):
+
+    def test_known_knots(self):
+        for model, tricolorable in ((trefoil(), True), (figure_eight(), False), (cinquefoil(), False),
+                                    (three_twist(), False), (KnotModel(*twist_knot(4)), True),
+                                    (kinked_unknot(), False)):
+            self.assertEqual(model.is_tricolorable()[0], tricolorable)
+
+    def test_coloring(self):
+        for model in (trefoil(), KnotModel(*twist_knot(4)), KnotModel(*pretzel_knot(3, 3, 3))):
+            tricolorable, coloring = model.is_tricolorable()
+
+            self.assertTrue(tricolorable)
+            self.assertEqual(len(coloring), len(model.get_arcs()))
+            self.assertTrue(model.is_valid_coloring(coloring))
+
+    def test_number_of_colorings(self):
+        models = [trefoil(), figure_eight(), three_twist(), KnotModel(*pretzel_knot(3, 3, 3))]
+        models.extend(KnotModel(*random_walk(25, seed=seed)).simplified() for seed in (6, 13, 16))
+
+        for model in models:
+            self.assertEqual(model.number_of_tricolorings(), brute_force(model))
+
+        self.assertEqual(KnotModel(*pretzel_knot(3, 3, 3)).number_of_tricolorings(), 27)
+
+
+if __name__ == '__main__':
+    unittest.main()